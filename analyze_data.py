@@ -9,6 +9,7 @@ import numpy as np
 import quantities as pq
 import elephant
 import load_data as ld
+from networkunit.utils import cached_BinnedSpikeTrain, NeuronTypeIndex
 
 
 
@@ -16,7 +17,8 @@ import load_data as ld
 def covariance_analysis(sts, 
                         binsize  = 150*pq.ms, 
                         binrange = [-0.3,0.3],
-                        nbins    = 100):
+                        nbins    = 100,
+                        neuron_types = None):
     '''
     Performs a covariance analysis.
     
@@ -24,19 +26,23 @@ def covariance_analysis(sts,
         sts: spiketrains that have been annotated with 'exc', 'inh,
              or 'mix' indicating neuron type
         binsize: size of bins used for the analysis
+        neuron_types: NeuronTypeIndex of sts, e.g. as returned by 
+                      load_data.neuron_type_separation. If None, it is 
+                      taken from the annotations of sts
         
     OUTPUT:
         pdf: dictionary of probability density distributions for 
              'exc', 'inh, or 'mix'
     '''
     covm = cross_covariance(sts, binsize=binsize)
-    neu_types = get_neuron_types(sts)
+    if neuron_types is None:
+        neuron_types = NeuronTypeIndex.from_annotations(sts)
     C   = dict()
     pdf = dict()
     
-    for nty in set(neu_types):
-        ids = np.where([neu_types[i]==nty for i in xrange(len(sts))])[0]
-        pdf[nty], bins, C[nty] = get_pdf(covm, ids, binrange=binrange, nbins=nbins)
+    for nty in neuron_types.types():
+        pdf[nty], bins, C[nty] = get_pdf(covm, neuron_types.ids(nty), 
+                                         binrange=binrange, nbins=nbins)
         
     return pdf, bins, C
         
@@ -58,7 +64,7 @@ def cross_covariance(sts, binsize, minNspk=3):
         minNspk spikes, otherwise assigned value is NaN. 
     '''
     
-    binned = elephant.conversion.BinnedSpikeTrain(sts, binsize = binsize)
+    binned = cached_BinnedSpikeTrain(sts, binsize = binsize)
     covm = elephant.spike_train_correlation.covariance(binned)
     
     for i, st in enumerate(sts):
@@ -1,8 +1,8 @@
 from elephant.spike_train_correlation import covariance
-from elephant.conversion import BinnedSpikeTrain
 from numpy import triu_indices
 from quantities import ms
 from networkunit.capabilities import ProducesSample
+from networkunit.utils import cached_BinnedSpikeTrain
 
 ########## Deprecated! ##########
 
@@ -27,7 +27,8 @@ class ProducesCovariances(ProducesSample):
             elephant.spike_train_correlation.covariance()
 
         kwargs:
-            Passed to elephant.conversion.BinnedSpikeTrain()
+            Passed to elephant.conversion.BinnedSpikeTrain(). The binned
+            spike trains are taken from networkunit.utils.binning_cache.
 
         Returns : list of floats
             list of covariances of length = (N^2 - N)/2 where N is the number
@@ -37,9 +38,9 @@ class ProducesCovariances(ProducesSample):
         try:
             def robust_BinnedSpikeTrain(spiketrains, binsize=2*ms, num_bins=None,
                                         t_start=None, t_stop=None, **add_args):
-                return BinnedSpikeTrain(spiketrains, binsize=binsize,
-                                        num_bins=num_bins, t_start=t_start,
-                                        t_stop=t_stop)
+                return cached_BinnedSpikeTrain(spiketrains, binsize=binsize,
+                                               num_bins=num_bins,
+                                               t_start=t_start, t_stop=t_stop)
             if spiketrain_list is None:
                 # assuming the class has the property 'spiketrains' and it
                 # contains a list of neo.Spiketrains
@@ -8,6 +8,10 @@ from neo.core import SpikeTrain
 from neo.io import NeoHdf5IO
 from copy import copy
 import numpy as np
+import quantities as pq
+import bisect
+import pickle
+import h5py
 import os
 import neo
 
@@ -17,7 +21,8 @@ class cortical_microcircuit_data(data_model, ProducesSpikeTrains):
     an already performed simulation of the Potjans-Diesman cortical
     microcircuit model.
     """
-    def load(self, file_path, client=None, **kwargs):
+    def load(self, file_path, client=None, n_spiketrains=None, t_start=None,
+             t_stop=None, lazy=False, **kwargs):
         """
         Loads spiketrains from a hdf5 file in the neo data format.
 
@@ -28,58 +33,210 @@ class cortical_microcircuit_data(data_model, ProducesSpikeTrains):
         client :
             When file is loaded from a collab storage a appropriate client
             must be provided.
+        n_spiketrains : int (default None)
+            Only the first n_spiketrains spike trains are read from the file.
+        t_start, t_stop : Quantity (default None)
+            Only the spikes within [t_start, t_stop] are read.
+        lazy : bool (default False)
+            If True, no spike trains are read here. produce_spiketrains()
+            then reads only the first max_subsamplesize spike trains of the
+            file.
         Returns :
             List of neo.SpikeTrains of length N
             """
-        # Load NEST or SpiNNaker data using NeoHdf5IO
+        # Load NEST or SpiNNaker data in the NeoHdf5IO format
         if file_path[-2:] != 'h5':
             raise IOError, 'file must be in hdf5 file in Neo format'
 
-        if client is None:
-            data = NeoHdf5IO(file_path)
-        else:
+        if client is not None:
             store_path = './' + file_path.split('/')[-1]
             client.download_file(file_path, store_path)
-            data = NeoHdf5IO(store_path)
+            file_path = store_path
+
+        self.load_params = {'file_path': file_path, 't_start': t_start,
+                            't_stop': t_stop}
+        if lazy:
+            return None
+        return self.read_spiketrains(file_path, n_spiketrains=n_spiketrains,
+                                     t_start=t_start, t_stop=t_stop)
 
-        spiketrains = data.read_block().list_children_by_class(SpikeTrain)
+    def read_spiketrains(self, file_path, n_spiketrains=None, t_start=None,
+                         t_stop=None):
+        """
+        Reads the first n_spiketrains spike trains of the first block of a
+        hdf5 file in the neo data format, in the same order as
+        NeoHdf5IO(file_path).read_block().list_children_by_class(SpikeTrain).
+        The spike trains which are not requested are not read from the file.
+
+        Parameters
+        ----------
+        file_path : string
+            Path to file
+        n_spiketrains : int (default None)
+            Number of spike trains to read, all if None.
+        t_start, t_stop : Quantity (default None)
+            If given, the spike trains are cut to [t_start, t_stop] (as
+            neo.SpikeTrain.time_slice()). Only the spikes within the window
+            are read from the file, which requires sorted spike times.
+        Returns :
+            List of neo.SpikeTrains
+        """
+        data = h5py.File(file_path, 'r')
+        try:
+            block = [node for name, node in data.items()
+                     if 'Block' in name][0]
+            nodes = []
+            for seg_name, segment in block['segments'].items():
+                if 'Segment' not in seg_name:
+                    continue
+                for name, node in segment['spiketrains'].items():
+                    if 'SpikeTrain' in name:
+                        nodes.append(node)
+                        if len(nodes) == n_spiketrains:
+                            break
+                if len(nodes) == n_spiketrains:
+                    break
+            spiketrains = [self._read_spiketrain_node(node, t_start, t_stop)
+                           for node in nodes]
+        finally:
+            data.close()
         return spiketrains
 
+    @staticmethod
+    def _read_spiketrain_node(node, t_start=None, t_stop=None):
+        """
+        Reads one spike train group of the neo hdf5 format, with the
+        attributes and annotations which NeoHdf5IO would set. If t_start or
+        t_stop are given, the borders of the window are found by a binary
+        search in the sorted times dataset and only the spikes within the
+        window are read from the file.
+        """
+        def quantity(dataset):
+            unit = [key for key in dataset.attrs.keys()
+                    if 'unit' in key][0].split('__')[1]
+            return getattr(pq, unit)
+
+        times = node['times']
+        units = quantity(times)
+        st_start = node['t_start'][()] * quantity(node['t_start'])
+        st_stop = node['t_stop'][()] * quantity(node['t_stop'])
+        first, last = 0, len(times)
+        if t_start is not None:
+            st_start = max(st_start, t_start)
+            first = bisect.bisect_left(times, t_start.rescale(units).magnitude)
+        if t_stop is not None:
+            st_stop = min(st_stop, t_stop)
+            last = bisect.bisect_right(times, t_stop.rescale(units).magnitude)
+        attributes = {}
+        for name in ('name', 'description', 'index', 'file_origin',
+                     'object_ref'):
+            if name in node.attrs:
+                attributes[name] = node.attrs[name]
+        attributes.update(pickle.loads(node.attrs['annotations']))
+        return SpikeTrain(times[first:max(first, last)] * units,
+                          t_start=st_start, t_stop=st_stop, **attributes)
+
     def _align_to_zero(self, spiketrains=None):
+        """
+        Shifts all spike trains by the earliest t_start, so that they start
+        at 0. The spike times of all trains are shifted in one operation on a
+        single buffer, the new spike trains are views into this buffer.
+        """
         if spiketrains is None:
             spiketrains = self.spiketrains
-        t_lims = [(st.t_start, st.t_stop) for st in spiketrains]
-        tmin = min(t_lims, key=lambda f: f[0])[0]
-        tmax = max(t_lims, key=lambda f: f[1])[1]
+        if not len(spiketrains):
+            return spiketrains
         unit = spiketrains[0].units
-        for count, spiketrain in enumerate(spiketrains):
-            spiketrains[count] = SpikeTrain(
-                np.array(spiketrain.tolist()) * unit - tmin,
-                t_start=0 * unit,
-                t_stop=tmax - tmin)
+        t_starts = np.array([st.t_start.rescale(unit).magnitude
+                             for st in spiketrains])
+        t_stops = np.array([st.t_stop.rescale(unit).magnitude
+                            for st in spiketrains])
+        tmin = t_starts.min()
+        t_stop = (t_stops.max() - tmin) * unit
+        # only trains in other units are rescaled, so that the concatenation
+        # is the only copy of the spike times
+        times = np.concatenate([st.magnitude if st.units == unit
+                                else st.rescale(unit).magnitude
+                                for st in spiketrains])
+        times -= tmin
+        offsets = np.cumsum([len(st) for st in spiketrains])[:-1]
+        for count, st_times in enumerate(np.split(times, offsets)):
+            spiketrains[count] = SpikeTrain(st_times, units=unit,
+                                            t_start=0 * unit,
+                                            t_stop=t_stop, copy=False)
         return spiketrains
 
     def preprocess(self, spiketrain_list, max_subsamplesize=None,
-                   align_to_0=True, **kwargs):
+                   align_to_0=True, subsample='first', seed=None, **kwargs):
         """
         Performs preprocessing on the spiketrain data according to the given
         parameters which are passed down from the test test parameters.
+
+        With subsample='first' the first max_subsamplesize spike trains are
+        used, with subsample='random' a random subset of max_subsamplesize
+        spike trains drawn with the given seed (in their original order).
+        The subset is a list referencing the loaded spike trains, its indices
+        are stored in self.subsample_index (None if all are used).
         """
         if spiketrain_list is not None and max_subsamplesize is not None:
-            spiketrains = spiketrain_list[:max_subsamplesize]
+            if subsample == 'first':
+                self.subsample_index = np.arange(
+                    min(max_subsamplesize, len(spiketrain_list)))
+            elif subsample == 'random':
+                rng = np.random.RandomState(seed)
+                self.subsample_index = np.sort(rng.choice(
+                    len(spiketrain_list),
+                    min(max_subsamplesize, len(spiketrain_list)),
+                    replace=False))
+            else:
+                raise NameError("Subsample method name not known!")
+            spiketrains = [spiketrain_list[i] for i in self.subsample_index]
         else:
+            self.subsample_index = None
             spiketrains = copy(spiketrain_list)
 
         if align_to_0:
             spiketrains = self._align_to_zero(spiketrains)
         return spiketrains
 
+    # parameters which determine the result of preprocess()
+    preprocess_params = ('max_subsamplesize', 'align_to_0', 'subsample',
+                         'seed')
+
     def produce_spiketrains(self, **kwargs):
         """
         overwrites function in class ProduceCovariances
+
+        The preprocessed spike trains are stored per setting of the
+        preprocess_params, so that all tests with the same setting get the
+        same list of spike trains and share their binned representations
+        (see networkunit.utils.binning_cache). The parameters passed by a
+        test are only used for this call, they do not change self.params.
         """
-        self.params.update(kwargs)
-        self.spiketrains = self.data
+        params = dict(self.params, **kwargs)
+        key = tuple(repr(params.get(name))
+                    for name in self.preprocess_params)
+        if not hasattr(self, '_preprocessed'):
+            self._preprocessed = {}
+        # unseeded random subsamples are drawn anew on every call
+        cache = params.get('subsample') != 'random' \
+                or params.get('seed') is not None
+        if cache and key in self._preprocessed:
+            self.spiketrains, self.subsample_index = self._preprocessed[key]
+            return self.spiketrains
+
+        if self.data is None:
+            # lazily loaded model, reads only the spike trains needed (all of
+            # them for random subsamples, which are then kept in self.data)
+            if params.get('subsample') == 'random':
+                self.data = self.read_spiketrains(**self.load_params)
+                self.spiketrains = self.data
+            else:
+                self.spiketrains = self.read_spiketrains(
+                    n_spiketrains=params.get('max_subsamplesize'),
+                    **self.load_params)
+        else:
+            self.spiketrains = self.data
         if type(self.spiketrains) == list:
             for st in self.spiketrains:
                 if type(st) == neo.core.spiketrain.SpikeTrain:
@@ -87,7 +244,10 @@ class cortical_microcircuit_data(data_model, ProducesSpikeTrains):
         else:
             raise TypeError, 'loaded data is not a list of neo.SpikeTrain'
 
-        self.spiketrains = self.preprocess(self.spiketrains, **self.params)
+        self.spiketrains = self.preprocess(self.spiketrains, **params)
+        if cache:
+            self._preprocessed[key] = (self.spiketrains,
+                                       self.subsample_index)
         return self.spiketrains
         
         
@@ -1,11 +1,13 @@
 from networkunit.capabilities import ProducesCovariances
 from networkunit.models import data_model
+from networkunit.utils import SpikeTrainColumns, NeuronTypeIndex
 import os
 import glob
 import copy
 import warnings
 import numpy as np
 import quantities as pq
+import neo
 from neo.io.blackrockio import BlackrockIO
 import odml
 import re
@@ -17,19 +19,21 @@ class resting_state_data(data_model, ProducesCovariances):
     """
 
     def load(self, file_path='./i140701-004', class_file=None, eiThres=0.4,
-             t_start = None, t_stop = None, **kwargs):
+             t_start = None, t_stop = None, load_waveforms = False,
+             nsx_to_load = 'none', **kwargs):
         '''
         Loads nikos2 resting state data.
         For spike trains loads only those with annotation 'sua' = True.
-        Returns neo matrices of spike trains and analog signals.
+        Waveforms and analog signals are only loaded when requested by
+        load_waveforms and nsx_to_load.
+        Returns neo matrices of spike trains.
         '''
         session = RestingStateIO(file_path)
-        block = session.read_block(n_starts = t_start, n_stops = t_stop,
-                                   channels = 'all', units = 'all',
-                                   nsx_to_load = 2, load_waveforms = True)
         # load only those spike trains with annotation 'sua' = True
-        self.spiketrains = np.asarray([ st for st in block.segments[0].spiketrains
-                           if st.annotations['sua'] ])
+        self.spiketrains = np.asarray(session.read_sua_spiketrains(
+                                          n_start = t_start, n_stop = t_stop,
+                                          load_waveforms = load_waveforms,
+                                          nsx_to_load = nsx_to_load))
         if class_file:
             self._neuron_type_separation(self.spiketrains,
                                          eiThres=eiThres,
@@ -57,22 +61,16 @@ class resting_state_data(data_model, ProducesCovariances):
                        large amount of units will then not be classified.
 
         OUTPUT:
-        None
+        None, the NeuronTypeIndex of the units is stored in
+        self.neuron_types
         '''
         Nunits = len(sts)
-        consistency = np.loadtxt(class_file,
-                                 dtype=np.float16)
-        exc = np.where(consistency >= 1 - eiThres)[0]
-        inh = np.where(consistency <= eiThres)[0]
-        mix = np.where(np.logical_and(consistency > eiThres,
-                                      consistency < 1 - eiThres))[0]
-
-        for i in exc:
-            sts[i].annotations['neu_type'] = 'exc'
-        for i in inh:
-            sts[i].annotations['neu_type'] = 'inh'
-        for i in mix:
-            sts[i].annotations['neu_type'] = 'mix'
+        self.neuron_types = NeuronTypeIndex.from_consistency(class_file,
+                                                             eiThres=eiThres)
+        self.neuron_types.annotate(sts)
+        exc = self.neuron_types.ids('exc')
+        inh = self.neuron_types.ids('inh')
+        mix = self.neuron_types.ids('mix')
 
         print '\n## Classification of waveforms resulted in:'
         print '{}/{} ({:0.1f}%) neurons classified as putative excitatory'.format(
@@ -97,6 +95,44 @@ class RestingStateIO(BlackrockIO):
             distinguish SUA and MUA.
     """
 
+    @staticmethod
+    def _latest_sorting_version(filename):
+        nev_versions = [re.sub(
+            os.path.extsep + 'nev$', '', p) for p in glob.glob(
+                filename + '*.nev')]
+        nev_versions = [p.replace(filename, '') for p in nev_versions]
+        if nev_versions:
+            return sorted(nev_versions)[-1]
+        return None
+
+    @staticmethod
+    def _txt_postfix(filename, sorting_version):
+        if sorting_version:
+            if os.path.isfile(r'' + filename + sorting_version + "-test.txt"):
+                return sorting_version + '-test'
+            elif os.path.isfile(r'' + filename + sorting_version + ".txt"):
+                return sorting_version
+        return None
+
+    @classmethod
+    def spike_data_files(cls, filename):
+        """
+        Returns the files which are read for the spike trains of the session
+        filename (without extension): the .nev file of the latest sorting
+        version, its .txt sorting file and the .ccf file, if present. The
+        .nsX files of the analog signals are not included.
+        """
+        sorting_version = cls._latest_sorting_version(filename)
+        if sorting_version is None:
+            return []
+        files = [filename + sorting_version + '.nev']
+        txtpostfix = cls._txt_postfix(filename, sorting_version)
+        if txtpostfix:
+            files.append(filename + txtpostfix + '.txt')
+        if os.path.isfile(filename + '.ccf'):
+            files.append(filename + '.ccf')
+        return files
+
     def __init__(
             self, filename, odmldir=None, nsx_override=None, nev_override=None,
             sif_override=None, ccf_override=None, odml_filename=None,
@@ -116,23 +152,11 @@ class RestingStateIO(BlackrockIO):
             filename = re.sub(os.path.extsep + ext + '$', '', filename)
 
 
-        sorting_version = None
-        txtpostfix = None
         if nev_override:
             sorting_version = nev_override
         else:
-            nev_versions = [re.sub(
-                os.path.extsep + 'nev$', '', p) for p in glob.glob(
-                    filename + '*.nev')]
-            nev_versions = [p.replace(filename, '') for p in nev_versions]
-            if nev_versions:
-                sorting_version = sorted(nev_versions)[-1]
-
-        if sorting_version:
-            if os.path.isfile(r'' + filename + sorting_version + "-test.txt"):
-                txtpostfix = sorting_version + '-test'
-            elif os.path.isfile(r'' + filename + sorting_version + ".txt"):
-                txtpostfix = sorting_version
+            sorting_version = self._latest_sorting_version(filename)
+        txtpostfix = self._txt_postfix(filename, sorting_version)
 
         # Initialize file
         BlackrockIO.__init__(
@@ -284,6 +308,218 @@ class RestingStateIO(BlackrockIO):
         return self.__sua_ids[electrode - 1]
 
 
+    def __get_elid_list_ca(self):
+        """
+        Returns the list of electrode IDs along the linear connector aligned
+        index, or None if it is not known for the monkey of the session.
+        """
+        monkey_prefix = os.path.basename(self.filename)[0]
+        if monkey_prefix in 'si':
+            return [-1, 81, 83, 85, 88, 90, 92, 93, 96, -1,
+                    79, 80, 84, 86, 87, 89, 91, 94, 63, 95,
+                    77, 78, 82, 49, 53, 55, 57, 59, 61, 32,
+                    75, 76, 45, 47, 51, 56, 58, 60, 64, 30,
+                    73, 74, 41, 43, 44, 46, 52, 62, 31, 28,
+                    71, 72, 39, 40, 42, 50, 54, 21, 29, 26,
+                    69, 70, 37, 38, 48, 15, 19, 25, 27, 24,
+                    67, 68, 35, 36, 5, 17, 13, 23, 20, 22,
+                    65, 66, 33, 34, 7, 9, 11, 12, 16, 18,
+                    - 1, 2, 1, 3, 4, 6, 8, 10, 14, -1]
+        self._print_verbose('No connector aligned electrode IDs available '
+                            'for monkey %s'%monkey_prefix)
+        return None
+
+
+    def read_sua_spiketimes(self, n_start=None, n_stop=None):
+        """
+        Reads the spike times of the single units (SUA) directly from the
+        memory-mapped data packets of the nev file. Only the timestamp,
+        electrode and unit columns of the spike packets are accessed, the
+        spikes are grouped per unit by a single stable sort.
+
+        The spike times are identical to those of the SUA spiketrains
+        returned by read_block(). The time range is taken from the nev file
+        alone, so if nsX files are loaded, read_block() may end later.
+
+        Args:
+            n_start (None, Quantity):
+                Start time of the data. If None, the intrinsic recording start
+                time is used.
+            n_stop (None, Quantity):
+                Stop time of the data. If None, the intrinsic recording stop
+                time is used.
+
+        Returns:
+            units (list):
+                (electrode ID, unit ID) of each SUA present in the nev file,
+                in the order of read_block().
+            spiketimes (list):
+                Spike times of each unit in multiples of the nev timestamp
+                resolution (float arrays, views into one common array).
+            n_start, n_stop (Quantity):
+                Start and stop time of the data.
+        """
+        filename = '.'.join([self._filenames['nev'], 'nev'])
+        header = np.fromfile(filename, count=1, dtype=[
+            ('file_type_id', 'S8'),
+            ('ver_major', 'uint8'),
+            ('ver_minor', 'uint8'),
+            ('additionnal_flags', 'uint16'),
+            ('bytes_in_headers', 'uint32'),
+            ('bytes_in_data_packets', 'uint32'),
+            ('timestamp_resolution', 'uint32')])[0]
+        event_unit = pq.CompoundUnit("1.0/{0} * s".format(
+            header['timestamp_resolution']))
+
+        units = [(el_id, un_id) for el_id in range(1, 97)
+                 for un_id in self.get_sua_ids(el_id)]
+        unit_codes = np.array([256 * el_id + un_id for el_id, un_id in units],
+                              dtype=int)
+
+        packets = np.memmap(filename, mode='r',
+                            offset=int(header['bytes_in_headers']), dtype=[
+                                ('timestamp', 'uint32'),
+                                ('packet_id', 'uint16'),
+                                ('unit_class_nb', 'uint8'),
+                                ('reserved', 'uint8'),
+                                ('waveform', 'V{0}'.format(
+                                    header['bytes_in_data_packets'] - 8))])
+
+        # the time range of the nev file, as for read_block(): from 0 to the
+        # timestamp of the last data packet
+        min_time = 0 * event_unit
+        max_time = (int(packets['timestamp'][-1]) if len(packets) else 0) \
+                   * event_unit
+        n_start = min_time if n_start is None else max(n_start, min_time)
+        n_stop = max_time if n_stop is None else min(n_stop, max_time)
+        n_start = n_start.rescale(event_unit)
+        n_stop = n_stop.rescale(event_unit)
+        # the packet id of spike packets is the electrode id
+        codes = 256 * packets['packet_id'].astype(int) \
+                + packets['unit_class_nb']
+        in_units = np.in1d(codes, unit_codes)
+        codes = codes[in_units]
+        timestamps = packets['timestamp'][in_units]
+        del packets
+
+        # read_block() skips units without any spike in the file
+        exists = np.in1d(unit_codes, codes)
+
+        in_time = (timestamps >= n_start.magnitude) \
+                  & (timestamps <= n_stop.magnitude)
+        codes = codes[in_time]
+        timestamps = timestamps[in_time]
+
+        # stable sort keeps the file order of the spikes of each unit
+        order = np.argsort(codes, kind='mergesort')
+        codes = codes[order]
+        timestamps = timestamps[order].astype(float)
+        starts = np.searchsorted(codes, unit_codes, side='left')
+        stops = np.searchsorted(codes, unit_codes, side='right')
+
+        units = [unit for unit, ex in zip(units, exists) if ex]
+        spiketimes = [timestamps[start:stop] for start, stop, ex
+                      in zip(starts, stops, exists) if ex]
+        return units, spiketimes, n_start, n_stop
+
+
+    def read_sua_columns(self, n_start=None, n_stop=None):
+        """
+        Loads the spike times of the single units (SUA) into a columnar
+        container without creating neo objects.
+
+        Args:
+            n_start (None, Quantity):
+                Start time of the data, see read_sua_spiketimes().
+            n_stop (None, Quantity):
+                Stop time of the data, see read_sua_spiketimes().
+
+        Returns:
+            SpikeTrainColumns
+                Spike times of the units in the order of
+                read_sua_spiketrains(), annotated with el_id, ca_id and sua.
+        """
+        elid_list_ca = self.__get_elid_list_ca()
+        if elid_list_ca is None:
+            return SpikeTrainColumns.from_spiketimes([], 0, 0)
+        units, spiketimes, n_start, n_stop = self.read_sua_spiketimes(
+            n_start=n_start, n_stop=n_stop)
+        el_ids = [el_id for el_id, _ in units]
+        return SpikeTrainColumns.from_spiketimes(
+            spiketimes, n_start.magnitude, n_stop.magnitude,
+            units=n_start.units, el_id=el_ids,
+            ca_id=[elid_list_ca.index(el_id) + 1 for el_id in el_ids],
+            sua=[True] * len(units))
+
+
+    def read_sua_spiketrains(self, n_start=None, n_stop=None,
+                             load_waveforms=False, nsx_to_load='none'):
+        """
+        Fast path to load only the spike times of the single units (SUA)
+        listed in the sorting txt file. Neither analog signals nor waveforms
+        are loaded unless they are explicitly requested. Without them, the
+        spike times are taken from read_sua_spiketimes().
+
+        Args:
+            n_start (None, Quantity):
+                Start time of the data. If None, the intrinsic recording start
+                time is used.
+            n_stop (None, Quantity):
+                Stop time of the data. If None, the intrinsic recording stop
+                time is used.
+            load_waveforms (boolean):
+                If True, waveforms are attached to the spiketrains.
+            nsx_to_load (int, list, str):
+                ID(s) of nsx file(s) from which to load analog signals, see
+                read_block(). Default: 'none'
+
+        Returns:
+            list
+                List of neo.SpikeTrain objects with annotation 'sua' = True in
+                the same order as in the block returned by read_block().
+        """
+        elid_list_ca = self.__get_elid_list_ca()
+        if elid_list_ca is None:
+            # SUA are only annotated for connector aligned electrodes
+            return []
+
+        if not load_waveforms and nsx_to_load in ['none', None, []]:
+            units, spiketimes, n_start, n_stop = self.read_sua_spiketimes(
+                n_start=n_start, n_stop=n_stop)
+            sts = []
+            for (el_id, un_id), times in zip(units, spiketimes):
+                st = neo.SpikeTrain(
+                    times=times * n_start.units,
+                    name="Unit {0}".format(1000 * el_id + un_id),
+                    description='SpikeTrain from channel: {0}, unit: {1}'
+                                ''.format(el_id, un_id),
+                    file_origin='.'.join([self._filenames['nev'], 'nev']),
+                    t_start=n_start,
+                    t_stop=n_stop)
+                st.annotate(unit_id=int(un_id),
+                            channel_id=int(el_id),
+                            el_id=int(el_id),
+                            ca_id=elid_list_ca.index(el_id) + 1,
+                            sua=True)
+                sts.append(st)
+            return sts
+
+        units = {}
+        for el_id in range(1, 97):
+            if self.get_sua_ids(el_id):
+                units[el_id] = list(self.get_sua_ids(el_id))
+        if not units:
+            self._print_verbose("No SUA found - no txt file loaded.")
+            return []
+
+        block = self.read_block(
+            n_starts=n_start, n_stops=n_stop, channels=sorted(units.keys()),
+            units=units, nsx_to_load=nsx_to_load,
+            load_waveforms=load_waveforms)
+        return [st for st in block.segments[0].spiketrains
+                if st.annotations.get('sua', False)]
+
+
     def read_block(
             self, index=None, name=None, description=None, nsx_to_load='none',
             n_starts=None, n_stops=None, channels=range(1, 97), units='none',
@@ -481,22 +717,10 @@ class RestingStateIO(BlackrockIO):
         # Annotate corrections to block
         block.annotate(corrected=corrections)
 
-        monkey_prefix = os.path.basename(self.filename)[0]
         # Annotate Block with electrode id list for connector alignment
-        if monkey_prefix in 'si':
-            block.annotate(elid_list_ca=[-1, 81, 83, 85, 88, 90, 92, 93, 96, -1,
-                                         79, 80, 84, 86, 87, 89, 91, 94, 63, 95,
-                                         77, 78, 82, 49, 53, 55, 57, 59, 61, 32,
-                                         75, 76, 45, 47, 51, 56, 58, 60, 64, 30,
-                                         73, 74, 41, 43, 44, 46, 52, 62, 31, 28,
-                                         71, 72, 39, 40, 42, 50, 54, 21, 29, 26,
-                                         69, 70, 37, 38, 48, 15, 19, 25, 27, 24,
-                                         67, 68, 35, 36, 5, 17, 13, 23, 20, 22,
-                                         65, 66, 33, 34, 7, 9, 11, 12, 16, 18,
-                                         - 1, 2, 1, 3, 4, 6, 8, 10, 14, -1])
-        else:
-            self._print_verbose('No connector aligned electrode IDs available '
-                                'for monkey %s'%monkey_prefix)
+        elid_list_ca = self.__get_elid_list_ca()
+        if elid_list_ca is not None:
+            block.annotate(elid_list_ca=elid_list_ca)
 
         # Add annotations to analogsignals and spiketrains in block
         if 'elid_list_ca' in block.annotations:
@@ -2,12 +2,11 @@ import sciunit
 from networkunit.capabilities import ProducesSpikeTrains
 import numpy as np
 from elephant.spike_train_generation import single_interaction_process as SIP
-from elephant.spike_train_generation import compound_poisson_process as CPP
-from elephant.spike_train_generation import homogeneous_poisson_process as HPP
 from quantities import ms, Hz, quantity
 from networkunit.plots import rasterplot
-import neo
+from networkunit.utils import SpikeTrainColumns
 import random
+import multiprocessing
 
 
 class stochastic_activity(sciunit.Model, ProducesSpikeTrains):
@@ -26,32 +25,138 @@ class stochastic_activity(sciunit.Model, ProducesSpikeTrains):
               'bkgr_correlation': 0.,
               'max_pattern_length':100 * ms,
               'shuffle': False,
-              'shuffle_seed': None}
+              'shuffle_seed': None,
+              'seed': None,
+              'block_size': 1000,
+              'n_processes': 1}
 
     def __init__(self, name=None, **params):
-        self.params.update(params)
+        # the class defaults are copied, so that the parameters of one
+        # instance (e.g. its seed) do not leak into later instances
+        self.params = dict(self.params, **params)
         # updating params is only for testing reasons
         # for usage in the validation framework, the params need to be fixed!
         self.__dict__.update(self.params)
         self.check_input()
-        self.spiketrains = self.generate_spiketrains()
+        # the spike trains are generated on demand by produce_spiketrains()
+        # or the first access of self.spiketrains, always from the same
+        # realisation of the network
+        self._spiketrains = None
+        self.columns = None
+        self._subsets = {}
+        self._subset_spiketrains = {}
+        if self.seed is None:
+            self._seed = np.random.randint(np.iinfo(np.int32).max)
+        else:
+            self._seed = self.seed
         super(stochastic_activity, self).__init__(name=name, **self.params)
 
     def check_input(self):
         if not type(self.correlations) == list:
             self.correlations = [self.correlations] * len(self.assembly_sizes)
         elif len(self.correlations) == 1:
-            self.correlations *= len(self.assembly_sizes)
+            self.correlations = self.correlations * len(self.assembly_sizes)
         pass
 
-    def produce_spiketrains(self, **kwargs):
-        if not self.spiketrains:
-            self.spiketrains = self.generate_spiketrains(**kwargs)
-        return self.spiketrains
+    def produce_spiketrains(self, max_subsamplesize=None, t_start=None,
+                            t_stop=None, **kwargs):
+        """
+        Returns the spike trains of the network, generating them on the first
+        request. With max_subsamplesize, only the first max_subsamplesize
+        spike trains are returned, and if the whole network was not
+        generated yet, only the blocks containing them are generated (see
+        generate_columns()). With t_start and t_stop the spike trains are
+        cut to this window. The neo.SpikeTrain objects are only created for
+        the returned spike trains (see spiketrain_columns()).
+        """
+        if max_subsamplesize is not None and max_subsamplesize >= self.size:
+            max_subsamplesize = None
+        if (t_start is not None and t_start > self.t_start) \
+                or (t_stop is not None and t_stop < self.t_stop):
+            columns, assembly = self.spiketrain_columns(max_subsamplesize)
+            columns = columns.time_slice(
+                self.t_start if t_start is None else t_start,
+                self.t_stop if t_stop is None else t_stop)
+            return self._to_spiketrains(columns, assembly)
+        if self._spiketrains is not None or max_subsamplesize is None:
+            return self.spiketrains[:max_subsamplesize]
+        if max_subsamplesize not in self._subset_spiketrains:
+            self._subset_spiketrains[max_subsamplesize] = \
+                self._to_spiketrains(
+                            *self.spiketrain_columns(max_subsamplesize))
+        return self._subset_spiketrains[max_subsamplesize]
+
+    @property
+    def spiketrains(self):
+        """
+        The list of neo.SpikeTrain of the whole network, generated on the
+        first access.
+        """
+        if self._spiketrains is None:
+            self._spiketrains = self._to_spiketrains(
+                                                *self.spiketrain_columns())
+        return self._spiketrains
+
+    @spiketrains.setter
+    def spiketrains(self, spiketrains):
+        self._spiketrains = spiketrains
+
+    def spiketrain_columns(self, n_spiketrains=None):
+        """
+        Returns the spike times of the network, or of its first
+        n_spiketrains spike trains, as SpikeTrainColumns together with the
+        assembly of each spike train (-1 for the background), without
+        creating neo.SpikeTrain objects. The columns of the whole network
+        are generated once and kept in self.columns; a subset of a network
+        which was not generated as a whole is generated from the blocks
+        containing it and kept as well.
+        """
+        if n_spiketrains is not None and n_spiketrains >= self.size:
+            n_spiketrains = None
+        if self.columns is None and n_spiketrains is None:
+            self.columns, self.assembly = self.generate_columns()
+        if self.columns is not None:
+            if n_spiketrains is None:
+                return self.columns, self.assembly
+            return (self.columns.select(slice(None, n_spiketrains)),
+                    self.assembly[:n_spiketrains])
+        if n_spiketrains not in self._subsets:
+            self._subsets[n_spiketrains] = self.generate_columns(
+                                                n_spiketrains=n_spiketrains)
+        return self._subsets[n_spiketrains]
+
+    def generate_spiketrains(self, n_spiketrains=None, **kwargs):
+        """
+        Generates the spike trains of the network, or only the first
+        n_spiketrains of them, as list of neo.SpikeTrain (see
+        generate_columns()).
+        """
+        return self._to_spiketrains(
+                            *self.generate_columns(n_spiketrains=n_spiketrains))
 
-    def generate_spiketrains(self, **kwargs):
-        spiketrains = [None] * self.size
+    @staticmethod
+    def _to_spiketrains(columns, assembly):
+        spiketrains = columns.to_spiketrains()
+        for st, assembly_id in zip(spiketrains, assembly):
+            if assembly_id < 0:
+                st.annotations = {}
+            else:
+                st.annotations = {'Assembly': int(assembly_id)}
+        return spiketrains
+
+    def generate_columns(self, n_spiketrains=None):
+        """
+        Generates the spike trains of the network, or only the first
+        n_spiketrains of them. The network is generated in blocks with
+        their own random streams, so a subset is identical to the
+        corresponding spike trains of the whole network; only the blocks
+        containing the requested spike trains are generated.
 
+        Returns : (SpikeTrainColumns, numpy.ndarray)
+            The spike trains, and the assembly of each spike train (-1 for
+            the background).
+        -------
+        """
         if self.correlation_method == 'pairwise_equivalent':
         # change input to pairwise correlations with expected distribution
         # correlation coefficients
@@ -67,135 +172,266 @@ class stochastic_activity(sciunit.Model, ProducesSpikeTrains):
             self.correlations = new_correlation
             self.correlation_method = 'CPP'
 
-        # generate correlated assemblies
-        for i, a_size in enumerate(self.assembly_sizes):
-            if a_size < 2:
-                raise ValueError, 'An assembly must consists of at least two units.'
-            generated_sts = int(np.sum(self.assembly_sizes[:i]))
-            spiketrains[generated_sts:generated_sts + a_size] \
-                = self._generate_assembly(correlation=self.correlations[i],
-                                          A_size=a_size)
-            for j in range(a_size):
-                spiketrains[generated_sts + j].annotations = {'Assembly': i}
+        # parameters of the correlated assemblies
+        assembly_sizes = np.array(self.assembly_sizes, dtype=int)
+        if len(assembly_sizes) and self.correlation_method \
+                not in ['CPP', 'spatio_temporal']:
+            raise NameError("Method name not known!")
+        if np.any(assembly_sizes < 2):
+            raise ValueError, 'An assembly must consists of at least two units.'
+        assembly_starts = np.concatenate(([0], np.cumsum(assembly_sizes)))
+        syncprobs = self._correlation_to_syncprob(
+                                    cc=np.array(self.correlations, dtype=float),
+                                    A_size=assembly_sizes,
+                                    rate=self.rate,
+                                    T=self.t_stop - self.t_start,
+                                    binsize=self.expected_binsize)
+        bkgr_syncprob = self._correlation_to_syncprob(cc=self.bkgr_correlation,
+                                                      A_size=2,
+                                                      rate=self.rate,
+                                                      T=self.t_stop - self.t_start,
+                                                      binsize=self.expected_binsize)
+
+        # the network is generated in blocks of at most block_size units,
+        # each with its own random stream derived from the seed and the
+        # block, so that the result does not depend on n_processes
+        seed = self._seed
+        if self.shuffle:
+            order = range(self.size)
+            if self.shuffle_seed is not None:
+                random.Random(self.shuffle_seed).shuffle(order)
+            else:
+                order = np.random.RandomState([seed, 2]).permutation(self.size)
+        else:
+            order = np.arange(self.size)
+        needed = np.zeros(self.size, dtype=bool)
+        needed[order[:n_spiketrains]] = True
+        # the model itself is not picklable before sciunit's __init__, the
+        # blocks carry its parameters instead
+        attributes = dict((name, getattr(self, name)) for name in self.params)
+        blocks = []
+        block_assemblies = []
+        block_background = []
+        for A_size in np.unique(assembly_sizes):
+            assembly_ids = np.flatnonzero(assembly_sizes == A_size)
+            n_per_block = max(1, self.block_size // A_size)
+            for count in xrange(0, len(assembly_ids), n_per_block):
+                ids = assembly_ids[count:count + n_per_block]
+                if not any(needed[assembly_starts[i]:assembly_starts[i + 1]].any()
+                           for i in ids):
+                    continue
+                blocks.append((attributes, '_generate_assembly_block',
+                               {'A_size': A_size,
+                                'syncprobs': syncprobs[ids],
+                                'bkgr_syncprob': bkgr_syncprob},
+                               [seed, 1, int(A_size), count // n_per_block]))
+                block_assemblies.append(ids)
+        bkgr_start = sum(self.assembly_sizes)
+        bkgr_size = self.size - bkgr_start
+        if not self.bkgr_correlation > 0:
+            for count in xrange(0, bkgr_size, self.block_size):
+                units = slice(bkgr_start + count,
+                              bkgr_start + min(count + self.block_size,
+                                               bkgr_size))
+                if not needed[units].any():
+                    continue
+                block_background.append(units)
+                blocks.append((attributes, '_generate_background',
+                               {'size': min(self.block_size,
+                                            bkgr_size - count)},
+                               [seed, 0, count // self.block_size]))
+
+        if self.n_processes == 1 or len(blocks) < 2:
+            generated = map(_generate_block, blocks)
+        else:
+            pool = multiprocessing.Pool(processes=self.n_processes)
+            try:
+                generated = pool.map(_generate_block, blocks)
+            finally:
+                pool.close()
+                pool.join()
 
+        # network units of the generated blocks, in the order of generated
+        block_units = [np.concatenate([np.arange(assembly_starts[i],
+                                                 assembly_starts[i + 1])
+                                       for i in ids])
+                       for ids in block_assemblies]
         # generate background
         if self.bkgr_correlation > 0:
-            dummy = None
             # ToDo: background generation without cpp
+            if bkgr_size > 0:
+                raise NotImplementedError("Correlated background units are "
+                                          "not implemented!")
         else:
-            spiketrains[sum(self.assembly_sizes):] \
-                = np.array([HPP(rate=self.rate, t_start=self.t_start, t_stop=self.t_stop)
-                            for _ in range(self.size - sum(self.assembly_sizes))])
+            block_units += [np.arange(units.start, units.stop)
+                            for units in block_background]
+            if n_spiketrains is None:
+                self.background = SpikeTrainColumns.concatenate(
+                                        generated[len(block_assemblies):])
+        columns = SpikeTrainColumns.concatenate(generated)
+        position = np.zeros(self.size, dtype=int)
+        position[np.concatenate(block_units + [np.zeros(0, dtype=int)])] \
+            = np.arange(len(columns))
+        assembly = np.repeat(np.arange(len(assembly_sizes)), assembly_sizes)
+        assembly = np.concatenate((assembly,
+                                   -np.ones(self.size - len(assembly),
+                                            dtype=int)))
+        order = np.asarray(order)[:n_spiketrains]
+        return columns.select(position[order]), assembly[order]
 
-        if self.shuffle:
-            if self.shuffle_seed is None:
-                random.shuffle(spiketrains)
-            else:
-                random.Random(self.shuffle_seed).shuffle(spiketrains)
+    def _generate_background(self, size, rng=np.random):
+        """
+        Generates size independent Poisson spike trains with the given rate.
+        The spike counts of all units and then all spike times are each
+        drawn by one call of rng (a numpy.random.RandomState or the
+        numpy.random module) and kept as flat arrays in a
+        SpikeTrainColumns, which creates neo.SpikeTrain objects on demand.
+        The spike times of all units are sorted by one np.lexsort.
+        """
+        units = self.t_start.units
+        t_start = float(self.t_start.magnitude)
+        t_stop = float(self.t_stop.rescale(units).magnitude)
+        rate = float(self.rate.rescale(1. / units).magnitude)
+        counts = rng.poisson(rate * (t_stop - t_start), size=size)
+        times = rng.uniform(t_start, t_stop, size=np.sum(counts))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        return SpikeTrainColumns(times, offsets, t_start, t_stop,
+                                 units=units).sort()
 
-        return spiketrains
+    def _generate_assembly_block(self, A_size, syncprobs, bkgr_syncprob,
+                                 rng=np.random):
+        """
+        Generates the assemblies of one block, shifted in time for the
+        spatio_temporal correlation method.
+        """
+        assembly_sts = self._generate_CPP_assemblies(
+                                            A_size=A_size,
+                                            syncprobs=syncprobs,
+                                            bkgr_syncprob=bkgr_syncprob,
+                                            rng=rng)
+        if self.correlation_method == 'spatio_temporal':
+            assembly_sts = self._shift_spiketrains(assembly_sts, rng=rng)
+        return assembly_sts
 
-    def _generate_assembly(self, correlation, A_size, **kwargs):
+    def _generate_CPP_assemblies(self, A_size, syncprobs, bkgr_syncprob,
+                                 rng=np.random):
+        """
+        Generates K assemblies of A_size units as compound Poisson processes
+        (CPP), the k-th with synchrony probability syncprobs[k]. As in
+        elephant.spike_train_generation.compound_poisson_process, each
+        assembly has a mother Poisson process, whose events are copied to a
+        random subset of units with a size drawn from the amplitude
+        distribution. The mother processes, amplitudes and subsets of all
+        assemblies are drawn together by rng (a numpy.random.RandomState or
+        the numpy.random module).
 
-        syncprob = self._correlation_to_syncprob(cc=correlation,
-                                                 A_size=A_size,
-                                                 rate=self.rate,
-                                                 T=self.t_stop - self.t_start,
-                                                 binsize=self.expected_binsize)
-        bkgr_syncprob = self._correlation_to_syncprob(cc=self.bkgr_correlation,
-                                                      A_size=2,
-                                                      rate=self.rate,
-                                                      T=self.t_stop - self.t_start,
-                                                      binsize=self.expected_binsize)
-        if self.correlation_method == 'CPP' \
-        or self.correlation_method == 'spatio_temporal':
-            assembly_sts = self._generate_CPP_assembly(A_size=A_size,
-                                                       syncprob=syncprob,
-                                                       bkgr_syncprob=bkgr_syncprob)
-            if self.correlation_method == 'CPP':
-                return assembly_sts
-            else:
-                return self._shift_spiketrains(assembly_sts)
-        else:
-            raise NameError("Method name not known!")
+        Returns : SpikeTrainColumns
+            K * A_size spike trains, assembly by assembly.
+        -------
+        """
+        syncprobs = np.atleast_1d(syncprobs)
+        K = len(syncprobs)
+        amp_dist = np.zeros((K, A_size + 1))
+        amp_dist[:, 1] = 1. - syncprobs - bkgr_syncprob
+        amp_dist[:, 2] = bkgr_syncprob
+        amp_dist[:, A_size] = syncprobs
+        np.testing.assert_almost_equal(amp_dist.sum(axis=1), np.ones(K),
+                                       decimal=4)
+        amp_dist /= amp_dist.sum(axis=1)[:, np.newaxis]
+        ref_rate = self.rate * A_size / (1. + syncprobs * (A_size - 1))
+        mother_rate = A_size * ref_rate / np.dot(amp_dist, np.arange(A_size + 1))
+
+        units = self.t_start.units
+        t_start = float(self.t_start.magnitude)
+        t_stop = float(self.t_stop.rescale(units).magnitude)
+        mother_rate = mother_rate.rescale(1. / units).magnitude
+        mother_counts = rng.poisson(mother_rate * (t_stop - t_start))
+        event_assembly = np.repeat(np.arange(K), mother_counts)
+        event_times = rng.uniform(t_start, t_stop, size=len(event_assembly))
+        # amplitude of each event, sampled from the cumulative distribution
+        cum_dist = np.cumsum(amp_dist, axis=1)[event_assembly]
+        u = rng.uniform(0, 1, size=len(event_assembly))
+        amplitudes = (cum_dist < u[:, np.newaxis]).sum(axis=1)
+        # each event goes to the amplitude units of its assembly with the
+        # smallest random keys, i.e. to a random subset
+        keys = rng.uniform(0, 1, size=(len(event_assembly), A_size))
+        ranks = keys.argsort(axis=1).argsort(axis=1)
+        event_ids, unit_ids = np.nonzero(ranks < amplitudes[:, np.newaxis])
+        unit_ids += event_assembly[event_ids] * A_size
+
+        # spikes ordered by unit and, within each unit, by time
+        times = event_times[event_ids]
+        times = times[np.lexsort((times, unit_ids))]
+        offsets = np.concatenate(([0], np.cumsum(
+                                np.bincount(unit_ids, minlength=K * A_size))))
+        return SpikeTrainColumns(times, offsets, t_start, t_stop, units=units)
+
+    def _shift_spiketrains(self, assembly_sts, rng=np.random):
+        """
+        Shifts each spike train by a random time in [-max_pattern_length, 0),
+        drawn by rng (a numpy.random.RandomState or the numpy.random module),
+        and wraps the spikes leaving [t_start, t_stop) around to the other
+        end. The spike times of all units are shifted, wrapped and sorted in
+        one operation each on the flat times array.
+
+        Parameters
+        ----------
+        assembly_sts : SpikeTrainColumns or list of neo.SpikeTrain
 
-    def _generate_CPP_assembly(self, A_size, syncprob, bkgr_syncprob):
-        amp_dist = np.zeros(A_size + 1)
-        amp_dist[1] = 1. - syncprob - bkgr_syncprob
-        amp_dist[2] = bkgr_syncprob
-        amp_dist[A_size] = syncprob
-        np.testing.assert_almost_equal(sum(amp_dist), 1., decimal=4)
-        amp_dist *= (1. / sum(amp_dist))
-        ref_rate = self.rate * A_size / float(1+syncprob*(A_size-1))
-        return CPP(rate=ref_rate, A=amp_dist,
-                   t_start=self.t_start, t_stop=self.t_stop)
-
-    def _shift_spiketrains(self, assembly_sts):#
-        shifted_assembly_sts = [None] * len(assembly_sts)
-        for i, st in enumerate(assembly_sts):
-            spiketimes = np.array(st.tolist())
-            shift = np.random.rand() * self.max_pattern_length \
-                                     - self.max_pattern_length
-            shift = float(shift.rescale('ms'))
-            spiketimes = spiketimes + shift
-            pos_fugitives = np.where(spiketimes >= float(self.t_stop))[0]
-            neg_fugitives = np.where(spiketimes <= float(self.t_start))[0]
-            spiketimes[pos_fugitives] = spiketimes[pos_fugitives] - float(
-                self.t_stop)
-            spiketimes[neg_fugitives] = spiketimes[neg_fugitives] + float(
-                self.t_stop - self.t_start)
-            shifted_assembly_sts[i] = neo.SpikeTrain(times=sorted(spiketimes),
-                                                     units='ms',
-                                                     t_start=self.t_start,
-                                                     t_stop=self.t_stop)
-        return shifted_assembly_sts
+        Returns : SpikeTrainColumns
+            The shifted spike trains.
+        -------
+        """
+        if not isinstance(assembly_sts, SpikeTrainColumns):
+            assembly_sts = SpikeTrainColumns.from_spiketrains(assembly_sts)
+        units = assembly_sts.units
+        t_start = float(self.t_start.rescale(units).magnitude)
+        T = float((self.t_stop - self.t_start).rescale(units).magnitude)
+        max_shift = float(self.max_pattern_length.rescale(units).magnitude)
+        shifts = rng.rand(len(assembly_sts)) * max_shift - max_shift
+        times = assembly_sts.times \
+                + np.repeat(shifts, assembly_sts.spike_counts())
+        times = t_start + np.mod(times - t_start, T)
+        return SpikeTrainColumns(times, assembly_sts.offsets, t_start,
+                                 t_start + T, units=units).sort()
 
     def _correlation_to_syncprob(self, cc, A_size, rate, T, binsize):
-        if A_size < 2:
+        """
+        Synchrony probability of a CPP assembly of size A_size with pairwise
+        correlation coefficient cc. cc and A_size may be arrays, then the
+        probabilities of all assemblies are computed at once.
+        """
+        cc = np.asarray(cc, dtype=float)
+        n = np.asarray(A_size, dtype=float)
+        if np.any(n < 2):
             raise ValueError
-        if cc == 1.:
-            return 1.
-        if not cc:
-            return 0.
         m0 = rate * T / (float(T)/float(binsize))
         # ToDo: rate is given as expected rate but used as referemce rate!!!
         if type(m0) == quantity.Quantity:
-            m0 = m0.rescale('dimensionless')
-        n = float(A_size)
-        root = np.sqrt((cc*n -cc-n)**2 + 4*m0*(cc*n-cc-n+1))
-        adding = (n-1)*(-2*cc*m0 + cc*n + 2*m0) - n**2
-        denominator = 2 * (cc - 1.) * m0 * (n - 1.) ** 2
-        # root = np.sqrt(cc ** 2 * n ** 2
-        #                - 2 * cc ** 2 * n
-        #                + cc ** 2
-        #                + 4 * cc * m0 * n
-        #                - 4 * cc * m0
-        #                - 2 * cc * n ** 2
-        #                + 2 * cc * n
-        #                - 4 * m0 * n
-        #                + 4 * m0
-        #                + n ** 2)
-        #
-        # adding = (- 2 * cc * m0 * n
-        #           + 2 * cc * m0
-        #           + cc * n ** 2
-        #           - cc * n
-        #           + 2 * m0 * n
-        #           - 2 * m0
-        #           - n ** 2)
-        #
-        # denominator = 2 * (cc - 1.) * m0 * (n - 1.) ** 2
-        sync_prob = (n * root + adding) / denominator
-        if type(sync_prob) == quantity.Quantity:
-            if bool(sync_prob.dimensionality):
+            if bool(m0.simplified.dimensionality):
                 raise ValueError
-            else:
-                return float(sync_prob.magnitude)
-        else:
+            m0 = float(m0.rescale('dimensionless').magnitude)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            root = np.sqrt((cc*n -cc-n)**2 + 4*m0*(cc*n-cc-n+1))
+            adding = (n-1)*(-2*cc*m0 + cc*n + 2*m0) - n**2
+            denominator = 2 * (cc - 1.) * m0 * (n - 1.) ** 2
+            sync_prob = (n * root + adding) / denominator
+        sync_prob = np.where(cc == 1., 1., np.where(cc == 0., 0., sync_prob))
+        if sync_prob.ndim:
             return sync_prob
+        return float(sync_prob)
 
     def show_rasterplot(self, **kwargs):
-        return rasterplot(self.spiketrains, **kwargs)
+        return rasterplot(self.produce_spiketrains(), **kwargs)
 
 
 # Todo: Handle quantitiy inputs which are not ms or Hz
+
+
+def _generate_block(args):
+    # generates one block of the network in a (worker) process
+    attributes, method, kwargs, seed_key = args
+    model = stochastic_activity.__new__(stochastic_activity)
+    model.__dict__.update(attributes)
+    rng = np.random.RandomState(seed_key)
+    return getattr(model, method)(rng=rng, **kwargs)
@@ -1,9 +1,10 @@
 from elephant.spike_train_correlation import corrcoef, cch
-from elephant.conversion import BinnedSpikeTrain
 import numpy as np
 from quantities import ms, quantity
 from networkunit.tests.base_tests.ABCtest_two_sample_test import two_sample_test
 from networkunit.capabilities import ProducesSpikeTrains
+from networkunit.utils import tiled_covariance, pairwise_cch, \
+                             fft_pairwise_cch, cached_BinnedSpikeTrain
 from abc import ABCMeta, abstractmethod
 
 
@@ -35,9 +36,13 @@ class correlation_test(two_sample_test):
         if 'binsize' not in self.params and 'num_bins' not in self.params:
             self.params['binsize'] = 2*ms
         # check is model has already stored prediction
-        spiketrains = model.produce_spiketrains(**self.params)
-        return self.generate_correlations(spiketrains=spiketrains,
-                                         **self.params)
+        prediction = self.get_prediction(model)
+        if prediction is None:
+            spiketrains = model.produce_spiketrains(**self.params)
+            prediction = self.generate_correlations(spiketrains=spiketrains,
+                                                    **self.params)
+            self.set_prediction(model, prediction)
+        return prediction
 
     def validate_observation(self, observation):
         # ToDo: Check if observation values are legit (non nan, positive, ...)
@@ -51,11 +56,46 @@ class correlation_test(two_sample_test):
             t_stop = min([st.t_stop for st in spiketrains])
         if binsize is None and num_bins is None:
             binsize = self.params['binsize']
-        return BinnedSpikeTrain(spiketrains, binsize=binsize,
-                                num_bins=num_bins, t_start=t_start,
-                                t_stop=t_stop)
+        return cached_BinnedSpikeTrain(spiketrains, binsize=binsize,
+                                       num_bins=num_bins, t_start=t_start,
+                                       t_stop=t_stop)
 
-    def generate_correlations(self, spiketrains=None, binary=False, **kwargs):
+    def generate_correlations(self, spiketrains=None, binary=False,
+                              cc_method='elephant', tile_size=1000,
+                              tile_output=None, **kwargs):
+        """
+        Calculates the correlation coefficients between all pairs of spike
+        trains.
+
+        Parameters
+        ----------
+        cc_method : 'elephant', 'tiled' (default 'elephant')
+            'elephant' computes the full correlation coefficient matrix with
+            elephant.spike_train_correlation.corrcoef(), 'tiled' computes it
+            in blocks of tile_size x tile_size and never holds the full
+            N x N matrix (see networkunit.utils.tiled_covariance()).
+
+        tile_size : int (default 1000)
+            Size of the blocks in the 'tiled' mode.
+
+        tile_output : None, numpy.ndarray or string (default None)
+            Preallocated array or file name of a memory-mapped .npy file into
+            which the correlation coefficients are written in the 'tiled'
+            mode.
+
+        Returns : list of floats
+            list of correlation coefficients of length = (N^2 - N)/2 where N
+            is the number of spike trains.
+        -------
+        """
+        if cc_method == 'tiled':
+            if spiketrains is None:
+                spiketrains = self.spiketrains
+            binned_sts = self.robust_BinnedSpikeTrain(spiketrains, **kwargs)
+            return tiled_covariance(binned_sts, binary=binary, corrcoef=True,
+                                    tile_size=tile_size, out=tile_output)
+        elif cc_method != 'elephant':
+            raise NameError("Method name not known!")
         self.generate_cc_matrix(spiketrains=spiketrains,
                                     binary=binary, **kwargs)
         idx = np.triu_indices(len(self.cc_matrix), 1)
@@ -76,7 +116,8 @@ class correlation_test(two_sample_test):
             elephant.spike_train_correlation.covariance()
 
         kwargs:
-            Passed to elephant.conversion.BinnedSpikeTrain()
+            Passed to elephant.conversion.BinnedSpikeTrain(). The binned
+            spike trains are taken from networkunit.utils.binning_cache.
 
         Returns : list of floats
             list of covariances of length = (N^2 - N)/2 where N is the number
@@ -91,69 +132,104 @@ class correlation_test(two_sample_test):
         self.cc_matrix = corrcoef(binned_sts, binary=binary)
         return self.cc_matrix
 
-    def generate_cch_array(self, spiketrains, maxlag=None,
-                           **kwargs):
-        if not hasattr(self, 'cch_array'):
-            return self.cch_array
+    def generate_cch_array(self, spiketrains, maxlag=None, n_processes=1,
+                           cch_method='elephant', **kwargs):
+        """
+        Calculates the cross-correlation coefficient histograms of all pairs
+        of spike trains.
+
+        When mpi4py is available, the pairs are scattered across the MPI
+        nodes. Otherwise they are distributed over n_processes local worker
+        processes. Each spike train is binned only once in both cases.
+
+        With cch_method='fft' all spike trains are binned together and the
+        CCHs are computed in batches from one FFT per spike train (see
+        networkunit.utils.fft_pairwise_cch()). The values agree with the
+        'elephant' method up to an absolute error below 1e-10.
+
+        Parameters
+        ----------
+        spiketrains : list of neo.SpikeTrain
+
+        maxlag : int or quantity (default None)
+            Maximal lag of the CCH in bins or in time units. If None, the
+            test parameter 'maxlag' is used.
+
+        n_processes : int (default 1)
+            Number of local worker processes when no MPI is available. If
+            None, all available cores are used.
+
+        cch_method : 'elephant', 'fft' (default 'elephant')
+            'elephant' calls elephant.spike_train_correlation.cch() for each
+            pair, 'fft' uses the batched FFT engine.
+
+        kwargs:
+            Passed to elephant.spike_train_correlation.cch()
+
+        Returns : numpy.ndarray
+            Array of shape ((N^2 - N)/2, 2*maxlag+1) with the CCH of each
+            pair (i, j) in the order of numpy.triu_indices(N, 1). It is also
+            kept in self.cch_array, but not reused by later calls; the
+            predictions of the models are stored by generate_prediction().
+        -------
+        """
+        if 'binsize' in self.params:
+            binsize = self.params['binsize']
         else:
-            if 'binsize' in self.params:
-                binsize = self.params['binsize']
-            else:
-                t_lims = [(st.t_start, st.t_stop) for st in spiketrains]
-                tmin = min(t_lims, key=lambda f: f[0])[0]
-                tmax = max(t_lims, key=lambda f: f[1])[1]
-                T = tmax - tmin
-                binsize = T / float(self.params['num_bins'])
-            if maxlag is None:
-                maxlag = self.params['maxlag']
-            else:
-                self.params['maxlag'] = maxlag
-            if type(maxlag) == quantity.Quantity:
-                maxlag = int(float(maxlag.rescale('ms'))
-                           / float(binsize.rescale('ms')))
-            try:
-                from mpi4py import MPI
-                mpi = True
-            except:
-                mpi = False
-            N = len(spiketrains)
-            B = 2 * maxlag + 1
-            pairs_idx = np.triu_indices(N, 1)
-            pairs = [[i, j] for i, j in zip(pairs_idx[0], pairs_idx[1])]
-            if mpi:
-                comm = MPI.COMM_WORLD
-                rank = comm.Get_rank()
-                Nnodes = comm.Get_size()
-                comm.Barrier()
-                if rank == 0:
-                    split = np.array_split(pairs, Nnodes)
-                else:
-                    split = None
-                pair_per_node = int(np.ceil(float(len(pairs)) / Nnodes))
-                split_pairs = comm.scatter(split, root=0)
+            t_lims = [(st.t_start, st.t_stop) for st in spiketrains]
+            tmin = min(t_lims, key=lambda f: f[0])[0]
+            tmax = max(t_lims, key=lambda f: f[1])[1]
+            T = tmax - tmin
+            binsize = T / float(self.params['num_bins'])
+        if maxlag is None:
+            maxlag = self.params['maxlag']
+        else:
+            self.params['maxlag'] = maxlag
+        if type(maxlag) == quantity.Quantity:
+            maxlag = int(float(maxlag.rescale('ms'))
+                       / float(binsize.rescale('ms')))
+        try:
+            from mpi4py import MPI
+            mpi = True
+        except:
+            mpi = False
+        N = len(spiketrains)
+        pairs_idx = np.triu_indices(N, 1)
+        pairs = [[i, j] for i, j in zip(pairs_idx[0], pairs_idx[1])]
+        if mpi:
+            comm = MPI.COMM_WORLD
+            rank = comm.Get_rank()
+            Nnodes = comm.Get_size()
+            comm.Barrier()
+            if rank == 0:
+                split = np.array_split(pairs, Nnodes)
             else:
-                split_pairs = pairs
-                pair_per_node = len(pairs)
-
-            cch_array = np.zeros((pair_per_node, B))
-            max_cc = 0
-            for count, (i, j) in enumerate(split_pairs):
-                binned_sts_i = self.robust_BinnedSpikeTrain(spiketrains[i],
-                                                            binsize=binsize)
-                binned_sts_j = self.robust_BinnedSpikeTrain(spiketrains[j],
-                                                            binsize=binsize)
-                cch_array[count] = np.squeeze(cch(binned_sts_i,
-                                                  binned_sts_j,
-                                                  window=[-maxlag, maxlag],
-                                                  cross_corr_coef=True,
-                                                  **kwargs)[0])
-                max_cc = max([max_cc, max(cch_array[count])])
-            if mpi:
-                pop_cch = comm.gather(cch_array, root=0)
-                pop_max_cc = comm.gather(max_cc, root=0)
-                if rank == 0:
-                    cch_array = pop_cch
-                    max_cc = pop_max_cc
-            self.cch_array = cch_array
-            self.max_cc = max_cc
-            return self.cch_array
+                split = None
+            split_pairs = comm.scatter(split, root=0)
+            n_processes = 1
+        else:
+            split_pairs = pairs
+
+        if cch_method == 'fft':
+            binned_sts = self.robust_BinnedSpikeTrain(spiketrains,
+                                                      binsize=binsize)
+            cch_array = fft_pairwise_cch(binned_sts, split_pairs, maxlag,
+                                         **kwargs)
+        elif cch_method == 'elephant':
+            binned_sts = [self.robust_BinnedSpikeTrain([st],
+                                                       binsize=binsize)
+                          for st in spiketrains]
+            cch_array = pairwise_cch(binned_sts, split_pairs, maxlag,
+                                     n_processes=n_processes, **kwargs)
+        else:
+            raise NameError("Method name not known!")
+        max_cc = max([0, np.amax(cch_array)]) if len(cch_array) else 0
+        if mpi:
+            pop_cch = comm.gather(cch_array, root=0)
+            pop_max_cc = comm.gather(max_cc, root=0)
+            if rank == 0:
+                cch_array = pop_cch
+                max_cc = pop_max_cc
+        self.cch_array = cch_array
+        self.max_cc = max_cc
+        return self.cch_array
@@ -1,9 +1,12 @@
 from elephant.spike_train_correlation import covariance
-from elephant.conversion import BinnedSpikeTrain
 from numpy import triu_indices
-from quantities import ms
+from quantities import ms, Quantity
+import numpy as np
+import scipy.sparse as sps
 from networkunit.tests.base_tests.ABCtest_two_sample_test import two_sample_test
 from networkunit.capabilities import ProducesSpikeTrains
+from networkunit.utils import sparse_covariance, tiled_covariance, \
+                             cached_BinnedSpikeTrain, CovarianceAccumulator
 from abc import ABCMeta, abstractmethod
 
 
@@ -24,17 +27,21 @@ class covariance_test(two_sample_test):
             self.params.update(kwargs)
         if 'binsize' not in self.params and 'num_bins' not in self.params:
             self.params['binsize'] = 2*ms
-
-        self.spiketrains = model.produce_spiketrains(**self.params)
-        return self.generate_covariances(spiketrain_list=self.spiketrains,
-                                         **self.params)
+        prediction = self.get_prediction(model)
+        if prediction is None:
+            self.spiketrains = model.produce_spiketrains(**self.params)
+            prediction = self.generate_covariances(
+                spiketrain_list=self.spiketrains, **self.params)
+            self.set_prediction(model, prediction)
+        return prediction
 
     def validate_observation(self, observation):
         # ToDo: Check if observation values are legit (non nan, positive, ...)
         pass
 
     def generate_covariances(self, spiketrain_list=None, binary=False,
-                             ** kwargs):
+                             cov_method='elephant', tile_size=1000,
+                             tile_output=None, **kwargs):
         """
         Calculates the covariances between all pairs of spike trains.
 
@@ -48,8 +55,25 @@ class covariance_test(two_sample_test):
             Parameter is passed to
             elephant.spike_train_correlation.covariance()
 
+        cov_method : 'elephant', 'sparse', 'tiled' (default 'elephant')
+            'elephant' uses elephant.spike_train_correlation.covariance(),
+            'sparse' computes the covariances straight from the sparse
+            binned matrix without ever creating the dense binned array
+            (see networkunit.utils.sparse_covariance()),
+            'tiled' computes the covariance matrix in blocks of
+            tile_size x tile_size and never holds the full N x N matrix
+            (see networkunit.utils.tiled_covariance()).
+
+        tile_size : int (default 1000)
+            Size of the blocks in the 'tiled' mode.
+
+        tile_output : None, numpy.ndarray or string (default None)
+            Preallocated array or file name of a memory-mapped .npy file into
+            which the covariances are written in the 'tiled' mode.
+
         kwargs:
-            Passed to elephant.conversion.BinnedSpikeTrain()
+            Passed to elephant.conversion.BinnedSpikeTrain(). The binned
+            spike trains are taken from networkunit.utils.binning_cache.
 
         Returns : list of floats
             list of covariances of length = (N^2 - N)/2 where N is the number
@@ -58,15 +82,140 @@ class covariance_test(two_sample_test):
         """
         def robust_BinnedSpikeTrain(spiketrains, binsize=None, num_bins=None,
                                     t_start=None, t_stop=None, **add_args):
-            return BinnedSpikeTrain(spiketrains, binsize=binsize,
-                                    num_bins=num_bins, t_start=t_start,
-                                    t_stop=t_stop)
+            return cached_BinnedSpikeTrain(spiketrains, binsize=binsize,
+                                           num_bins=num_bins, t_start=t_start,
+                                           t_stop=t_stop)
         if spiketrain_list is None:
             # assuming the class has the property 'spiketrains' and it
             # contains a list of neo.Spiketrains
             binned_sts = robust_BinnedSpikeTrain(self.spiketrains, **kwargs)
         else:
             binned_sts = robust_BinnedSpikeTrain(spiketrain_list, **kwargs)
-        cov_matrix = covariance(binned_sts, binary=binary)
+        if cov_method == 'tiled':
+            return tiled_covariance(binned_sts, binary=binary,
+                                    tile_size=tile_size, out=tile_output)
+        elif cov_method == 'elephant':
+            cov_matrix = covariance(binned_sts, binary=binary)
+        elif cov_method == 'sparse':
+            cov_matrix = sparse_covariance(binned_sts, binary=binary)
+        else:
+            raise NameError("Method name not known!")
         idx = triu_indices(len(cov_matrix), 1)
         return cov_matrix[idx]
+
+    def start_online_covariances(self, n_neurons, t_start=0*ms, binsize=None,
+                                 binary=False):
+        """
+        Starts an incremental estimate of the covariances of n_neurons spike
+        trains, which are passed chunk by chunk in time order to
+        update_online_covariances() while they are recorded, e.g. during a
+        running simulation. The estimate of all spikes passed so far is
+        returned by online_prediction() and online_score().
+
+        Parameters
+        ----------
+        n_neurons : int
+            Number of spike trains.
+        t_start : Quantity (default 0 ms)
+            Start time of the first bin.
+        binsize : Quantity (default None)
+            Size of the bins. If None, the binsize of the test parameters is
+            used (default 2 ms).
+        binary : bool (default False)
+            If True, bins with more than one spike are counted as one spike.
+        """
+        if binsize is None:
+            binsize = self.params.get('binsize', 2*ms)
+        self._online = {'n_neurons': n_neurons,
+                        't_start': t_start,
+                        'binsize': binsize,
+                        'binary': binary,
+                        'accumulator': CovarianceAccumulator(),
+                        'num_bins': 0,
+                        # bin indices of spikes in the last incomplete bin
+                        'pending': [np.zeros(0, dtype=int)] * n_neurons}
+
+    def update_online_covariances(self, spiketrains, t_stop):
+        """
+        Adds the next chunk of spikes to the online estimate.
+
+        Parameters
+        ----------
+        spiketrains : list of neo.SpikeTrain or of Quantity arrays
+            Spike times of each of the n_neurons spike trains since the
+            previous chunk, up to t_stop.
+        t_stop : Quantity
+            End of the chunk. All bins which end before t_stop are complete
+            and added to the estimate; spikes of the last incomplete bin are
+            kept until the next chunk.
+
+        A ValueError is raised if the number of spike trains is not
+        n_neurons, or if a spike or t_stop lies in a bin which was already
+        added.
+        """
+        online = self._online_state()
+        if len(spiketrains) != online['n_neurons']:
+            raise ValueError("Expected {} spike trains, got {}!".format(
+                online['n_neurons'], len(spiketrains)))
+        t_start, binsize = online['t_start'], online['binsize']
+        num_bins = int(((t_stop - t_start).rescale(binsize.units)
+                        / binsize).magnitude)
+        if num_bins < online['num_bins']:
+            raise ValueError("t_stop lies before the end of the previous "
+                             "chunk!")
+        # all chunks are checked before the estimate is changed
+        bin_ids = []
+        for i, spikes in enumerate(spiketrains):
+            spikes = spikes.view(Quantity)
+            idx = np.array(((spikes - t_start).rescale(binsize.units)
+                            / binsize).magnitude, dtype=int)
+            idx = idx[spikes >= t_start]
+            if np.any(idx < online['num_bins']):
+                raise ValueError("Spike train {} contains spikes in bins "
+                                 "which were already added!".format(i))
+            bin_ids.append(idx)
+        rows, cols = [], []
+        for i, idx in enumerate(bin_ids):
+            idx = np.concatenate((online['pending'][i], idx))
+            complete = idx < num_bins
+            online['pending'][i] = idx[~complete]
+            cols.append(idx[complete] - online['num_bins'])
+            rows.append(np.zeros(np.count_nonzero(complete), dtype=int) + i)
+        cols = np.concatenate(cols)
+        binned = sps.csr_matrix((np.ones(len(cols), dtype=int),
+                                 (np.concatenate(rows), cols)),
+                                shape=(online['n_neurons'],
+                                       num_bins - online['num_bins']),
+                                dtype=int)
+        binned.sum_duplicates()
+        if online['binary']:
+            binned.data[:] = 1
+        online['accumulator'].update(binned)
+        online['num_bins'] = num_bins
+
+    def _online_state(self):
+        if getattr(self, '_online', None) is None:
+            raise ValueError("The online estimate has not been started, "
+                             "call start_online_covariances() first!")
+        return self._online
+
+    def online_prediction(self):
+        """
+        Returns the covariances of all pairs of spike trains estimated from
+        the complete bins passed so far, in the format of
+        generate_covariances(). As long as fewer than two bins are complete
+        the covariances are not defined and NaN is returned for all pairs.
+        """
+        online = self._online_state()
+        idx = triu_indices(online['n_neurons'], 1)
+        if online['num_bins'] < 2:
+            return np.full(len(idx[0]), np.nan)
+        cov_matrix = online['accumulator'].covariance()
+        return cov_matrix[idx]
+
+    def online_score(self):
+        """
+        Returns the score of the current online estimate against the
+        observation.
+        """
+        return self.compute_score(self.observation, self.online_prediction())
@@ -2,6 +2,7 @@ import sciunit
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+import weakref
 from abc import ABCMeta, abstractmethod
 
 
@@ -22,10 +23,52 @@ class two_sample_test(sciunit.Test):
         To be overwritten by child class
         """
         self.params.update(kwargs)
-        try:
-            return model.produce_sample(**self.params)
-        except:
-            raise NotImplementedError("")
+        prediction = self.get_prediction(model)
+        if prediction is None:
+            try:
+                prediction = model.produce_sample(**self.params)
+            except:
+                raise NotImplementedError("")
+            self.set_prediction(model, prediction)
+        return prediction
+
+    def get_prediction(self, model):
+        """
+        Returns the prediction previously generated for this model with the
+        current test parameters, or None if there is none. Thereby judge()
+        and the visualize_* functions do not recompute the same sample.
+        A change of the test parameters invalidates the stored prediction.
+        The predictions are stored with weak references to the models, so
+        they are dropped together with their model.
+        """
+        if not hasattr(self, '_predictions'):
+            self._predictions = weakref.WeakKeyDictionary()
+        if model in self._predictions:
+            params_key, prediction = self._predictions[model]
+            if params_key == self._params_key():
+                return prediction
+            del self._predictions[model]
+        return None
+
+    def set_prediction(self, model, prediction):
+        """
+        Stores the prediction of the model for the current test parameters.
+        """
+        if not hasattr(self, '_predictions'):
+            self._predictions = weakref.WeakKeyDictionary()
+        self._predictions[model] = (self._params_key(), prediction)
+
+    def clear_predictions(self):
+        self._predictions = weakref.WeakKeyDictionary()
+
+    def __getstate__(self):
+        # stored predictions are neither pickled nor shared by copies
+        state = super(two_sample_test, self).__getstate__()
+        state.pop('_predictions', None)
+        return state
+
+    def _params_key(self):
+        return repr(sorted(self.params.items()))
 
     def compute_score(self, observation, prediction, **kwargs):
         self.params.update(kwargs)
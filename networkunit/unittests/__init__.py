@@ -0,0 +1,4 @@
+"""Unit tests of the NetworkUnit helper functions and models
+
+Run with: python -m unittest discover -s networkunit/unittests -t .
+"""
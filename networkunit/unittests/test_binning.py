@@ -0,0 +1,47 @@
+import gc
+import unittest
+import numpy as np
+import quantities as pq
+from elephant.conversion import BinnedSpikeTrain
+from networkunit.utils import BinnedSpikeTrainCache
+from networkunit.unittests.test_covariance import poisson_spiketrains
+
+
+class BinnedSpikeTrainCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = BinnedSpikeTrainCache()
+        self.sts = poisson_spiketrains(5)
+
+    def test_equals_elephant(self):
+        binned = self.cache.get(self.sts, binsize=5 * pq.ms)
+        np.testing.assert_array_equal(
+            binned.to_array(),
+            BinnedSpikeTrain(self.sts, binsize=5 * pq.ms).to_array())
+
+    def test_hit(self):
+        binned = self.cache.get(self.sts, binsize=5 * pq.ms)
+        self.assertIs(self.cache.get(list(self.sts), binsize=5 * pq.ms),
+                      binned)
+        self.assertIsNot(self.cache.get(self.sts, binsize=2 * pq.ms), binned)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_does_not_keep_spiketrains_alive(self):
+        self.cache.get(self.sts, binsize=5 * pq.ms)
+        self.assertGreater(self.cache.nbytes, 0)
+        del self.sts
+        gc.collect()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.nbytes, 0)
+
+    def test_max_bytes(self):
+        self.cache.max_bytes = self.cache._size(
+            BinnedSpikeTrain(self.sts[:1], binsize=5 * pq.ms)) * 2
+        for st in self.sts:
+            self.cache.get(st, binsize=5 * pq.ms)
+        self.assertLessEqual(self.cache.nbytes, self.cache.max_bytes)
+        self.assertLess(len(self.cache), len(self.sts))
+
+
+if __name__ == '__main__':
+    unittest.main()
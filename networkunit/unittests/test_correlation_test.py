@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.scores import ks_distance
+from networkunit.tests.base_tests import correlation_test
+from networkunit.unittests.test_covariance import poisson_spiketrains
+
+
+class sample_correlation_test(correlation_test):
+    score_type = ks_distance
+
+
+class GenerateCCHArrayTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test = sample_correlation_test(observation=None)
+        self.test.params = {'binsize': 2 * pq.ms, 'maxlag': 100}
+        self.sts = poisson_spiketrains(6, t_stop=1000 * pq.ms)
+
+    def test_not_reused_across_calls(self):
+        first = self.test.generate_cch_array(self.sts[:4], maxlag=10)
+        self.assertEqual(first.shape, (6, 21))
+        second = self.test.generate_cch_array(self.sts, maxlag=5)
+        self.assertEqual(second.shape, (15, 11))
+        self.assertIs(self.test.cch_array, second)
+        np.testing.assert_allclose(second[0], first[0][5:16], atol=1e-12)
+
+    def test_methods_agree(self):
+        np.testing.assert_allclose(
+            self.test.generate_cch_array(self.sts, maxlag=8,
+                                         cch_method='fft'),
+            self.test.generate_cch_array(self.sts, maxlag=8), atol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import unittest
+import numpy as np
+import quantities as pq
+from neo.core import SpikeTrain
+from neo.io import NeoHdf5IO
+from networkunit.models import model_cortical_microcircuit_data
+from networkunit.models.model_cortical_microcircuit_data import \
+    cortical_microcircuit_data
+
+DATA_FILE = os.path.join(os.path.dirname(
+    model_cortical_microcircuit_data.__file__), 'data',
+    'NEST_cort_microcircuit_model_spikes_L4I.h5')
+
+
+class ReadSpiketrainsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = NeoHdf5IO(DATA_FILE).read_block() \
+                                            .list_children_by_class(SpikeTrain)
+
+    def setUp(self):
+        self.model = cortical_microcircuit_data(DATA_FILE, lazy=True)
+
+    def assert_equal_spiketrains(self, sts, reference):
+        self.assertEqual(len(sts), len(reference))
+        for st, ref in zip(sts, reference):
+            np.testing.assert_array_equal(st.magnitude, ref.magnitude)
+            self.assertEqual(st.units, ref.units)
+            self.assertEqual(st.t_start, ref.t_start)
+            self.assertEqual(st.t_stop, ref.t_stop)
+            self.assertEqual(st.annotations, ref.annotations)
+
+    def test_equals_neo(self):
+        self.assert_equal_spiketrains(
+            self.model.read_spiketrains(DATA_FILE), self.reference)
+
+    def test_window_equals_time_slice(self):
+        for t_start, t_stop in ((1000 * pq.ms, 3 * pq.s),
+                                (None, 2000 * pq.ms), (-5 * pq.s, None)):
+            self.assert_equal_spiketrains(
+                self.model.read_spiketrains(DATA_FILE, n_spiketrains=20,
+                                            t_start=t_start, t_stop=t_stop),
+                [st.time_slice(t_start, t_stop)
+                 for st in self.reference[:20]])
+
+    def test_align_to_zero(self):
+        sts = [SpikeTrain([1.5, 2.], units='s', t_start=1 * pq.s,
+                          t_stop=3 * pq.s),
+               SpikeTrain([1200., 2500.], units='ms', t_start=1000 * pq.ms,
+                          t_stop=4000 * pq.ms),
+               SpikeTrain([], units='s', t_start=2 * pq.s, t_stop=3 * pq.s)]
+        aligned = self.model._align_to_zero(list(sts))
+        for st, ref in zip(aligned, sts):
+            self.assertEqual(st.units, pq.s)
+            self.assertEqual(st.t_start, 0 * pq.s)
+            self.assertEqual(st.t_stop, 3 * pq.s)
+            np.testing.assert_allclose(
+                st.magnitude, ref.rescale(pq.s).magnitude - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import quantities as pq
+from elephant.conversion import BinnedSpikeTrain
+from elephant.spike_train_correlation import covariance
+from elephant.spike_train_generation import homogeneous_poisson_process
+from networkunit.utils import sparse_covariance, tiled_covariance, \
+                             CovarianceAccumulator
+
+
+def poisson_spiketrains(n, rate=20 * pq.Hz, t_stop=2000 * pq.ms, seed=0):
+    np.random.seed(seed)
+    return [homogeneous_poisson_process(rate=rate, t_stop=t_stop)
+            for _ in range(n)]
+
+
+class SparseCovarianceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.binned = BinnedSpikeTrain(poisson_spiketrains(30),
+                                       binsize=2 * pq.ms)
+
+    def test_equals_elephant(self):
+        for binary in (False, True):
+            np.testing.assert_allclose(
+                sparse_covariance(self.binned, binary=binary),
+                covariance(self.binned, binary=binary), atol=1e-12)
+
+
+class TiledCovarianceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.binned = BinnedSpikeTrain(poisson_spiketrains(25),
+                                       binsize=2 * pq.ms)
+        self.idx = np.triu_indices(25, 1)
+
+    def test_equals_elephant(self):
+        for tile_size in (1, 7, 25, 100):
+            np.testing.assert_allclose(
+                tiled_covariance(self.binned, tile_size=tile_size),
+                covariance(self.binned)[self.idx], atol=1e-12)
+
+    def test_corrcoef(self):
+        np.testing.assert_allclose(
+            tiled_covariance(self.binned, corrcoef=True, tile_size=6),
+            np.corrcoef(self.binned.to_array())[self.idx], atol=1e-12)
+
+    def test_output_array(self):
+        out = np.zeros(len(self.idx[0]))
+        result = tiled_covariance(self.binned, tile_size=4, out=out)
+        self.assertIs(result, out)
+        self.assertRaises(ValueError, tiled_covariance, self.binned,
+                          out=np.zeros(3))
+
+
+class CovarianceAccumulatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.binned = BinnedSpikeTrain(poisson_spiketrains(20),
+                                       binsize=2 * pq.ms)
+
+    def test_chunks_equal_elephant(self):
+        dense = self.binned.to_array()
+        for binary in (False, True):
+            accumulator = CovarianceAccumulator()
+            for chunk in np.array_split(dense, 7, axis=1):
+                accumulator.update((chunk > 0).astype(int) if binary else chunk)
+            np.testing.assert_allclose(accumulator.covariance(),
+                                       covariance(self.binned, binary=binary),
+                                       atol=1e-12)
+
+    def test_binned_spiketrain(self):
+        accumulator = CovarianceAccumulator().update(self.binned)
+        self.assertEqual(accumulator.num_bins, self.binned.num_bins)
+        np.testing.assert_allclose(accumulator.covariance(),
+                                   covariance(self.binned), atol=1e-12)
+
+    def test_empty(self):
+        accumulator = CovarianceAccumulator()
+        self.assertRaises(ValueError, accumulator.covariance)
+        accumulator.update(np.ones((3, 1)))
+        self.assertRaises(ValueError, accumulator.covariance)
+
+
+class StarImportTestCase(unittest.TestCase):
+
+    def test_no_submodules_exported(self):
+        namespace = {}
+        exec "from networkunit.utils import *" in namespace
+        for name in ('covariance', 'binning', 'np', 'time', 'copy'):
+            self.assertNotIn(name, namespace)
+        self.assertIn('sparse_covariance', namespace)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.scores import ks_distance
+from networkunit.tests.base_tests import covariance_test
+from networkunit.unittests.test_covariance import poisson_spiketrains
+from networkunit.utils import CovarianceAccumulator, cached_BinnedSpikeTrain
+
+
+class sample_covariance_test(covariance_test):
+    score_type = ks_distance
+
+
+class GenerateCovariancesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test = sample_covariance_test(observation=None)
+        self.sts = poisson_spiketrains(15)
+
+    def test_methods_agree(self):
+        expected = self.test.generate_covariances(self.sts, binsize=2 * pq.ms)
+        for cov_method in ('sparse', 'tiled'):
+            np.testing.assert_allclose(
+                self.test.generate_covariances(self.sts, binsize=2 * pq.ms,
+                                               cov_method=cov_method,
+                                               tile_size=4),
+                expected, atol=1e-12)
+        self.assertRaises(NameError, self.test.generate_covariances,
+                          self.sts, binsize=2 * pq.ms, cov_method='dense')
+
+    def test_accumulator_over_segments(self):
+        # segments with borders on bin borders give the bins of the whole
+        expected = self.test.generate_covariances(self.sts, binsize=2 * pq.ms)
+        accumulator = CovarianceAccumulator()
+        for t_start in np.arange(0, 2000, 500) * pq.ms:
+            segment = [st.time_slice(t_start, t_start + 500 * pq.ms)
+                       for st in self.sts]
+            accumulator.update(cached_BinnedSpikeTrain(
+                segment, binsize=2 * pq.ms, t_start=t_start,
+                t_stop=t_start + 500 * pq.ms))
+        cov_matrix = accumulator.covariance()
+        np.testing.assert_allclose(
+            cov_matrix[np.triu_indices(len(self.sts), 1)], expected,
+            atol=1e-12)
+
+
+class OnlineCovariancesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test = sample_covariance_test(observation=None)
+        self.sts = poisson_spiketrains(10)
+
+    def test_equals_generate_covariances(self):
+        expected = self.test.generate_covariances(self.sts, binsize=2 * pq.ms)
+        self.test.start_online_covariances(len(self.sts), binsize=2 * pq.ms)
+        # chunk borders within bins
+        borders = np.array([0., 333., 1001., 1001., 1777., 2000.]) * pq.ms
+        for t_start, t_stop in zip(borders[:-1], borders[1:]):
+            chunk = [st[(st >= t_start) & (st < t_stop)] for st in self.sts]
+            self.test.update_online_covariances(chunk, t_stop)
+        np.testing.assert_allclose(self.test.online_prediction(), expected,
+                                   atol=1e-12)
+
+    def test_no_complete_bins(self):
+        self.test.start_online_covariances(len(self.sts), binsize=2 * pq.ms)
+        prediction = self.test.online_prediction()
+        self.assertEqual(len(prediction), 45)
+        self.assertTrue(np.all(np.isnan(prediction)))
+        self.test.update_online_covariances(
+            [st[st < 3 * pq.ms] for st in self.sts], 3 * pq.ms)
+        self.assertTrue(np.all(np.isnan(self.test.online_prediction())))
+
+
+    def test_invalid_input(self):
+        chunk = [st[st < 500 * pq.ms] for st in self.sts]
+        self.assertRaises(ValueError, self.test.update_online_covariances,
+                          chunk, 500 * pq.ms)
+        self.assertRaises(ValueError, self.test.online_prediction)
+        self.test.start_online_covariances(len(self.sts), binsize=2 * pq.ms)
+        for spiketrains in (chunk[:-1], chunk + chunk[:1]):
+            self.assertRaises(ValueError,
+                              self.test.update_online_covariances,
+                              spiketrains, 500 * pq.ms)
+        self.test.update_online_covariances(chunk, 500 * pq.ms)
+        # only the last spike train has a spike in an added bin
+        self.assertRaises(ValueError, self.test.update_online_covariances,
+                          [st[(st > 500 * pq.ms) & (st < 600 * pq.ms)]
+                           for st in self.sts[:-1]] + [self.sts[-1][:1]],
+                          600 * pq.ms)
+        self.assertRaises(ValueError, self.test.update_online_covariances,
+                          [st[:0] for st in self.sts], 400 * pq.ms)
+        # the rejected chunks did not change the estimate
+        np.testing.assert_allclose(
+            self.test.online_prediction(),
+            self.test.generate_covariances(
+                [st.time_slice(0 * pq.ms, 500 * pq.ms) for st in self.sts],
+                binsize=2 * pq.ms), atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import quantities as pq
+from elephant.conversion import BinnedSpikeTrain
+from elephant.spike_train_correlation import cch
+from networkunit.utils import pairwise_cch, fft_pairwise_cch
+from networkunit.unittests.test_covariance import poisson_spiketrains
+
+
+class PairwiseCCHTestCase(unittest.TestCase):
+
+    def setUp(self):
+        sts = poisson_spiketrains(6, t_stop=1000 * pq.ms)
+        self.binned = BinnedSpikeTrain(sts, binsize=2 * pq.ms)
+        self.binned_sts = [BinnedSpikeTrain(st, binsize=2 * pq.ms)
+                           for st in sts]
+        self.pairs = [(i, j) for i in range(6) for j in range(i + 1, 6)]
+        self.maxlag = 20
+
+    def elephant_cch(self, **kwargs):
+        return np.array([np.squeeze(cch(self.binned_sts[i],
+                                        self.binned_sts[j],
+                                        window=[-self.maxlag, self.maxlag],
+                                        cross_corr_coef=True, **kwargs)[0])
+                         for i, j in self.pairs])
+
+    def test_pairwise_cch_processes(self):
+        serial = pairwise_cch(self.binned_sts, self.pairs, self.maxlag)
+        np.testing.assert_array_equal(serial, self.elephant_cch())
+        np.testing.assert_array_equal(
+            pairwise_cch(self.binned_sts, self.pairs, self.maxlag,
+                         n_processes=2), serial)
+
+    def test_fft_equals_elephant(self):
+        np.testing.assert_allclose(
+            fft_pairwise_cch(self.binned, self.pairs, self.maxlag,
+                             batch_size=4),
+            self.elephant_cch(), atol=1e-10)
+
+    def test_fft_border_correction_and_kernel(self):
+        kernel = np.ones(5)
+        np.testing.assert_allclose(
+            fft_pairwise_cch(self.binned, self.pairs, self.maxlag,
+                             border_correction=True, kernel=kernel),
+            self.elephant_cch(border_correction=True, kernel=kernel),
+            atol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
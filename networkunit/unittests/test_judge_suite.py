@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.models.model_cortical_microcircuit_data import \
+    cortical_microcircuit_data
+from networkunit.unittests.test_cortical_microcircuit_data import DATA_FILE
+from networkunit.unittests.test_covariance_test import sample_covariance_test
+from networkunit.models.model_stochastic_activity import stochastic_activity
+from networkunit.utils import judge_suite, judge_subsamples, \
+                             null_distribution, binning_cache
+
+
+class JudgeSuiteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.model = cortical_microcircuit_data(DATA_FILE, name='L4I')
+        self.model.params = {}
+        params = {'max_subsamplesize': 40, 'binsize': 2 * pq.ms}
+        observation = sample_covariance_test(
+            observation=None).generate_covariances(self.model.data[-40:],
+                                                   **params)
+        self.test = sample_covariance_test(observation=observation)
+        self.test.params = params
+        self.score = self.test.judge(self.model).score
+
+    def assert_state_unchanged(self):
+        self.assertEqual(self.model.params, {})
+        self.assertEqual(sorted(self.test.params), ['binsize',
+                                                    'max_subsamplesize'])
+        self.assertEqual(self.test.judge(self.model).score, self.score)
+
+    def test_judge_suite(self):
+        for n_processes in (1, 2):
+            scores, wall_times = judge_suite([self.test], [self.model],
+                                             n_processes=n_processes)
+            self.assertEqual(scores[self.test][self.model].score, self.score)
+            self.assertEqual(wall_times.shape, (1, 1))
+            self.assert_state_unchanged()
+
+    def test_judge_subsamples(self):
+        results = []
+        for n_processes in (1, 2):
+            scores, _ = judge_subsamples(self.test, self.model, 3, seed=4,
+                                         n_processes=n_processes)
+            results.append([score.score for score in scores.values[0]])
+            self.assert_state_unchanged()
+        self.assertEqual(results[0], results[1])
+        # the subsets differ from each other and from the first spike trains
+        self.assertEqual(len(set(results[0] + [self.score])), 4)
+
+
+class parallel_stochastic_activity(stochastic_activity):
+    params = dict(stochastic_activity.params, n_processes=2)
+
+
+class NullDistributionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.model_params = {'size': 30, 't_stop': 2000 * pq.ms,
+                             'assembly_sizes': [5], 'correlations': 0.2,
+                             'block_size': 10}
+        self.test = sample_covariance_test(observation=np.zeros(10))
+        self.test.params = {'binsize': 2 * pq.ms}
+        self.model = stochastic_activity(seed=1, **self.model_params)
+        self.prediction = self.test.generate_prediction(self.model)
+
+    def test_caller_state_unchanged(self):
+        n_entries = len(binning_cache)
+        null_distribution(self.test, stochastic_activity, 2, seed=3,
+                          **self.model_params)
+        self.assertIs(self.test.get_prediction(self.model), self.prediction)
+        self.assertEqual(len(self.test._predictions), 1)
+        self.assertEqual(len(binning_cache), n_entries)
+        self.assertTrue(binning_cache.enabled)
+
+    def test_caller_params_unchanged(self):
+        self.test.params = {}
+        null_distribution(self.test, stochastic_activity, 1, seed=3,
+                          **self.model_params)
+        self.assertEqual(self.test.params, {})
+
+    def test_identical_across_n_processes(self):
+        scores = null_distribution(self.test, stochastic_activity, 3, seed=3,
+                                   **self.model_params)
+        self.assertEqual(len(set(scores)), 3)
+        # the models in the workers of the pool must not start a pool
+        np.testing.assert_array_equal(
+            null_distribution(self.test, parallel_stochastic_activity, 3,
+                              seed=3, n_processes=2, **self.model_params),
+            scores)
+
+
+if __name__ == '__main__':
+    unittest.main()
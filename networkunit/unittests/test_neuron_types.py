@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import neo
+import quantities as pq
+from networkunit.utils import NeuronTypeIndex, NEURON_TYPES
+
+
+def classify(consistency, eiThres):
+    # the per-unit classification which NeuronTypeIndex replaces
+    labels = [''] * len(consistency)
+    for i in np.where(consistency >= 1 - eiThres)[0]:
+        labels[i] = 'exc'
+    for i in np.where(consistency <= eiThres)[0]:
+        labels[i] = 'inh'
+    for i in np.where(np.logical_and(consistency > eiThres,
+                                     consistency < 1 - eiThres))[0]:
+        labels[i] = 'mix'
+    return labels
+
+
+class NeuronTypeIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.class_file = os.path.join(self.tmpdir, 'consistency.txt')
+        consistency = np.concatenate((np.random.RandomState(0).rand(50),
+                                      [0., 0.4, 0.5, 0.6, 1.]))
+        np.savetxt(self.class_file, consistency)
+        self.consistency = np.loadtxt(self.class_file, dtype=np.float16)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_from_consistency(self):
+        for eiThres in (0.1, 0.4, 0.5, 0.6):
+            index = NeuronTypeIndex.from_consistency(self.class_file,
+                                                     eiThres=eiThres)
+            labels = classify(self.consistency, eiThres)
+            self.assertEqual(list(index.labels()), labels)
+            for neu_type in NEURON_TYPES:
+                np.testing.assert_array_equal(
+                    index.ids(neu_type),
+                    [i for i, label in enumerate(labels)
+                     if label == neu_type])
+            self.assertEqual(index.types(),
+                             [neu_type for neu_type in NEURON_TYPES
+                              if neu_type in labels])
+
+    def test_labels_round_trip(self):
+        labels = ['inh', '', 'exc', 'inh', 'unknown', 'exc']
+        index = NeuronTypeIndex.from_labels(labels)
+        self.assertEqual(list(index.labels()),
+                         ['inh', '', 'exc', 'inh', '', 'exc'])
+        self.assertEqual(index.types(), ['exc', 'inh'])
+        self.assertEqual(len(index), 6)
+
+    def test_annotations_round_trip(self):
+        sts = [neo.SpikeTrain([1.] * pq.s, t_stop=2 * pq.s)
+               for _ in range(4)]
+        NeuronTypeIndex.from_labels(['mix', 'exc', '', 'inh']).annotate(sts)
+        self.assertNotIn('neu_type', sts[2].annotations)
+        self.assertEqual(list(NeuronTypeIndex.from_annotations(sts).labels()),
+                         ['mix', 'exc', '', 'inh'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from networkunit.utils import ObservationCache
+
+
+class ObservationCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ObservationCache(os.path.join(self.tmpdir, 'cache'))
+        self.data_file = os.path.join(self.tmpdir, 'data.txt')
+        with open(self.data_file, 'w') as f:
+            f.write('spikes')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_save_load(self):
+        key = self.cache.key([self.data_file], binsize=2)
+        self.assertIsNone(self.cache.load(key))
+        self.cache.save(key, {'exc': np.arange(3.)})
+        np.testing.assert_array_equal(self.cache.load(key)['exc'],
+                                      np.arange(3.))
+
+    def test_key_depends_on_content_and_params(self):
+        key = self.cache.key([self.data_file], binsize=2)
+        self.assertNotEqual(self.cache.key([self.data_file], binsize=3), key)
+        with open(self.data_file, 'w') as f:
+            f.write('other spikes')
+        os.utime(self.data_file, (0, 0))
+        self.assertNotEqual(self.cache.key([self.data_file], binsize=2), key)
+
+    def test_checksums_written_only_when_new(self):
+        self.cache.key([self.data_file])
+        checksum_file = self.cache._checksum_file
+        mtime = os.stat(checksum_file).st_mtime
+        os.utime(checksum_file, (0, 0))
+        self.cache.key([self.data_file])
+        self.assertEqual(os.stat(checksum_file).st_mtime, 0)
+        self.assertNotEqual(mtime, 0)
+
+    def test_default_dir_is_user_cache(self):
+        self.assertTrue(ObservationCache().cache_dir.startswith(
+            os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~'))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.models.model_resting_state_data import RestingStateIO
+
+PACKET_SIZE = 104
+
+
+def write_session(base, n_packets=3000, seed=0):
+    """
+    Writes a small synthetic session: nev files of version 2.3 with spikes
+    of 96 electrodes, and the sorting txt file of the first sorting version.
+    """
+    rng = np.random.RandomState(seed)
+    n_ext = 3 * 96
+    header = np.zeros(1, [
+        ('file_type_id', 'S8'), ('ver_major', 'uint8'),
+        ('ver_minor', 'uint8'), ('additionnal_flags', 'uint16'),
+        ('bytes_in_headers', 'uint32'), ('bytes_in_data_packets', 'uint32'),
+        ('timestamp_resolution', 'uint32'), ('sample_resolution', 'uint32'),
+        ('year', 'uint16'), ('month', 'uint16'), ('weekday', 'uint16'),
+        ('day', 'uint16'), ('hour', 'uint16'), ('minute', 'uint16'),
+        ('second', 'uint16'), ('millisecond', 'uint16'),
+        ('application_to_create_file', 'S32'), ('comment_field', 'S256'),
+        ('nb_ext_headers', 'uint32')])
+    header['file_type_id'] = 'NEURALEV'
+    header['ver_major'] = 2
+    header['ver_minor'] = 3
+    header['additionnal_flags'] = 1
+    header['bytes_in_headers'] = 336 + 32 * n_ext
+    header['bytes_in_data_packets'] = PACKET_SIZE
+    header['timestamp_resolution'] = 30000
+    header['sample_resolution'] = 30000
+    header['year'], header['month'], header['day'] = 2014, 7, 1
+    header['nb_ext_headers'] = n_ext
+    waveforms = np.zeros(96, [
+        ('packet_id', 'S8'), ('electrode_id', 'uint16'),
+        ('physical_connector', 'uint8'), ('connector_pin', 'uint8'),
+        ('digitization_factor', 'uint16'), ('energy_threshold', 'uint16'),
+        ('hi_threshold', 'int16'), ('lo_threshold', 'int16'),
+        ('nb_sorted_units', 'uint8'), ('bytes_per_waveform', 'uint8'),
+        ('spike_width', 'uint16'), ('unused', 'S8')])
+    waveforms['packet_id'] = 'NEUEVWAV'
+    waveforms['electrode_id'] = np.arange(1, 97)
+    waveforms['nb_sorted_units'] = 3
+    waveforms['bytes_per_waveform'] = 2
+    waveforms['spike_width'] = 48
+    waveforms['digitization_factor'] = 250
+    filters = np.zeros(96, [
+        ('packet_id', 'S8'), ('electrode_id', 'uint16'),
+        ('hi_freq_corner', 'uint32'), ('hi_freq_order', 'uint32'),
+        ('hi_freq_type', 'uint16'), ('lo_freq_corner', 'uint32'),
+        ('lo_freq_order', 'uint32'), ('lo_freq_type', 'uint16'),
+        ('unused', 'S2')])
+    filters['packet_id'] = 'NEUEVFLT'
+    filters['electrode_id'] = np.arange(1, 97)
+    labels = np.zeros(96, [('packet_id', 'S8'), ('electrode_id', 'uint16'),
+                           ('label', 'S16'), ('unused', 'S6')])
+    labels['packet_id'] = 'NEUEVLBL'
+    labels['electrode_id'] = np.arange(1, 97)
+    labels['label'] = ['chan%d' % i for i in range(1, 97)]
+    packets = np.zeros(n_packets, [
+        ('timestamp', 'uint32'), ('packet_id', 'uint16'),
+        ('unit_class_nb', 'uint8'), ('reserved', 'uint8'),
+        ('waveform', 'V%d' % (PACKET_SIZE - 8))])
+    packets['timestamp'] = np.sort(rng.randint(0, 30000 * 20, n_packets))
+    packets['packet_id'] = rng.randint(0, 97, n_packets)
+    packets['unit_class_nb'] = rng.choice([0, 1, 2, 3, 255], n_packets)
+    packets['unit_class_nb'][packets['packet_id'] == 0] = 0
+    # unit 2 of electrode 5 has no spikes
+    packets['unit_class_nb'][(packets['packet_id'] == 5)
+                             & (packets['unit_class_nb'] == 2)] = 1
+    # BlackrockIO requires the unsorted nev file next to the sorted one
+    for filename in (base + '.nev', base + '-01.nev'):
+        with open(filename, 'wb') as f:
+            for part in (header, waveforms, filters, labels, packets):
+                part.tofile(f)
+    n_sua = rng.randint(0, 3, 96)
+    n_sua[4] = 2
+    np.savetxt(base + '-01.txt',
+               np.c_[np.arange(1, 97), n_sua, np.where(n_sua < 2, 3, 0)],
+               fmt='%d')
+
+
+class ReadSuaSpiketimesTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.base = os.path.join(cls.tmpdir, 'i140701-004')
+        write_session(cls.base)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def read_block_sua(self, io, n_start=None, n_stop=None):
+        units = dict((el_id, list(io.get_sua_ids(el_id)))
+                     for el_id in range(1, 97) if io.get_sua_ids(el_id))
+        block = io.read_block(n_starts=n_start, n_stops=n_stop,
+                              channels=sorted(units), units=units,
+                              nsx_to_load='none')
+        return [st for st in block.segments[0].spiketrains
+                if st.annotations.get('sua', False)]
+
+    def test_equals_read_block(self):
+        for n_start, n_stop in ((None, None), (3.2 * pq.s, 12345 * pq.ms),
+                                (-1 * pq.s, 100 * pq.s)):
+            io = RestingStateIO(self.base)
+            sts = io.read_sua_spiketrains(n_start=n_start, n_stop=n_stop)
+            reference = self.read_block_sua(io, n_start, n_stop)
+            self.assertTrue(len(reference) > 10)
+            self.assertEqual(len(sts), len(reference))
+            for st, ref in zip(sts, reference):
+                np.testing.assert_array_equal(st.magnitude, ref.magnitude)
+                self.assertEqual(st.units, ref.units)
+                self.assertEqual(st.t_start, ref.t_start)
+                self.assertEqual(st.t_stop, ref.t_stop)
+                self.assertEqual(st.name, ref.name)
+                for key in ('unit_id', 'channel_id', 'el_id', 'ca_id', 'sua'):
+                    self.assertEqual(st.annotations[key],
+                                     ref.annotations[key])
+
+    def test_units_without_spikes_skipped(self):
+        units, spiketimes, _, _ = RestingStateIO(
+            self.base).read_sua_spiketimes()
+        self.assertNotIn((5, 2), units)
+        self.assertEqual(len(units), len(spiketimes))
+
+    def test_spike_data_files(self):
+        self.assertEqual(RestingStateIO.spike_data_files(self.base),
+                         [self.base + '-01.nev', self.base + '-01.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.utils import segment_offsets, slice_spiketrains
+from networkunit.unittests.test_covariance import poisson_spiketrains
+
+
+class SliceSpiketrainsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sts = poisson_spiketrains(5)
+        # segments overlapping each other and the borders of the trains,
+        # with borders on spike times
+        t0 = float(self.sts[0][3].magnitude)
+        self.t_starts = np.array([-100., 0., t0, 500., 1900.]) * pq.ms
+        self.t_stops = np.array([300., 0., t0, 1200., 2500.]) * pq.ms
+
+    def test_equals_time_slice(self):
+        sliced = slice_spiketrains(self.sts, self.t_starts.rescale(pq.s),
+                                   self.t_stops.rescale(pq.s))
+        self.assertEqual(sliced.shape, (len(self.t_starts), len(self.sts)))
+        for k, (t_start, t_stop) in enumerate(zip(self.t_starts,
+                                                  self.t_stops)):
+            for i, st in enumerate(self.sts):
+                expected = st.time_slice(t_start, t_stop)
+                np.testing.assert_array_equal(sliced[k, i].magnitude,
+                                              expected.magnitude)
+                # the borders are rescaled from s to ms
+                self.assertAlmostEqual(sliced[k, i].t_start.rescale(pq.ms),
+                                       expected.t_start, places=9)
+                self.assertAlmostEqual(sliced[k, i].t_stop.rescale(pq.ms),
+                                       expected.t_stop, places=9)
+
+    def test_views(self):
+        sliced = slice_spiketrains(self.sts, self.t_starts, self.t_stops)
+        self.assertTrue(np.may_share_memory(sliced[3, 0], self.sts[0]))
+
+    def test_segment_offsets(self):
+        times = [st.magnitude for st in self.sts]
+        starts, stops = segment_offsets(times, self.t_starts.magnitude,
+                                        self.t_stops.magnitude)
+        for i, st in enumerate(times):
+            for k in range(len(self.t_starts)):
+                mask = (st >= self.t_starts[k].magnitude) \
+                       & (st <= self.t_stops[k].magnitude)
+                np.testing.assert_array_equal(st[starts[i, k]:stops[i, k]],
+                                              st[mask])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+import quantities as pq
+from elephant.conversion import BinnedSpikeTrain
+from networkunit.utils import SpikeTrainColumns
+from networkunit.unittests.test_covariance import poisson_spiketrains
+
+
+class SpikeTrainColumnsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sts = poisson_spiketrains(8)
+        # a spike exactly on a bin border and one on t_stop
+        self.sts[0] = self.sts[0].merge(
+            self.sts[0].__class__([4., 2000.], units=pq.ms, t_stop=2000.))
+        neu_types = ['exc', 'inh', 'mix', 'exc', '', 'inh', 'exc', 'exc']
+        for count, (st, neu_type) in enumerate(zip(self.sts, neu_types)):
+            st.annotate(neu_type=neu_type, el_id=count + 1, ca_id=count + 10,
+                        sua=count % 2 == 0)
+        self.columns = SpikeTrainColumns.from_spiketrains(self.sts)
+
+    def assert_equal_spiketrains(self, columns, reference):
+        self.assertEqual(len(columns), len(reference))
+        for st, ref in zip(columns, reference):
+            np.testing.assert_array_equal(st.magnitude,
+                                          ref.rescale(st.units).magnitude)
+            self.assertEqual(st.t_start, ref.t_start)
+            self.assertEqual(st.t_stop, ref.t_stop)
+            for key in ('neu_type', 'el_id', 'ca_id', 'sua'):
+                self.assertEqual(st.annotations[key], ref.annotations[key])
+
+    def test_round_trip(self):
+        self.assert_equal_spiketrains(self.columns, self.sts)
+        self.assertEqual(list(self.columns.spike_counts()),
+                         [len(st) for st in self.sts])
+
+    def test_binned_equals_elephant(self):
+        for binsize, t_start, t_stop in ((2 * pq.ms, None, None),
+                                         (5 * pq.ms, 100 * pq.ms,
+                                          1500 * pq.ms),
+                                         (3 * pq.ms, None, 1 * pq.s)):
+            expected = BinnedSpikeTrain(self.sts, binsize=binsize,
+                                        t_start=t_start, t_stop=t_stop)
+            binned = self.columns.binned(binsize, t_start=t_start,
+                                         t_stop=t_stop)
+            self.assertEqual(binned.shape, expected.to_sparse_array().shape)
+            np.testing.assert_array_equal(binned.toarray(),
+                                          expected.to_array())
+
+    def test_time_slice(self):
+        for t_start, t_stop in ((250 * pq.ms, 1.2 * pq.s),
+                                (-1 * pq.s, 4 * pq.ms),
+                                (0 * pq.ms, 2000 * pq.ms)):
+            self.assert_equal_spiketrains(
+                self.columns.time_slice(t_start, t_stop),
+                [st.time_slice(t_start, t_stop) for st in self.sts])
+
+    def test_select(self):
+        for index in (slice(2, 6), [5, 0, 3], np.arange(8) % 3 == 0,
+                      slice(None, 0)):
+            self.assert_equal_spiketrains(
+                self.columns.select(index),
+                [self.sts[i] for i in np.arange(8)[index]])
+        self.assertIsInstance(self.columns[1:3], SpikeTrainColumns)
+
+    def test_by_type(self):
+        for neu_type in ('exc', 'inh', 'mix'):
+            self.assert_equal_spiketrains(
+                self.columns.by_type(neu_type),
+                [st for st in self.sts
+                 if st.annotations['neu_type'] == neu_type])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import numpy as np
+import quantities as pq
+from networkunit.models.model_stochastic_activity import stochastic_activity
+from networkunit.utils import SpikeTrainColumns
+
+PARAMS = {'size': 120, 't_stop': 2000 * pq.ms, 'assembly_sizes': [4, 6, 6],
+          'correlations': [0.1, 0.2, 0.3], 'correlation_method': 'CPP',
+          'shuffle': False, 'shuffle_seed': None, 'seed': 7, 'block_size': 25,
+          'n_processes': 1}
+
+
+def model(**params):
+    return stochastic_activity(**dict(PARAMS, **params))
+
+
+class SpikeTrainColumnsSortTestCase(unittest.TestCase):
+
+    def test_equals_sort_per_unit(self):
+        rng = np.random.RandomState(0)
+        counts = rng.poisson(20, size=30)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        times = rng.uniform(0, 1, size=offsets[-1])
+        columns = SpikeTrainColumns(times.copy(), offsets, 0, 1).sort()
+        for i in range(30):
+            np.testing.assert_array_equal(
+                columns.spiketimes(i), np.sort(times[offsets[i]:offsets[i + 1]]))
+
+
+class ProduceSpiketrainsTestCase(unittest.TestCase):
+
+    def assert_equal_spiketrains(self, sts, reference):
+        self.assertEqual(len(sts), len(reference))
+        for st, ref in zip(sts, reference):
+            np.testing.assert_array_equal(st.magnitude, ref.magnitude)
+            self.assertEqual(st.t_start, ref.t_start)
+            self.assertEqual(st.t_stop, ref.t_stop)
+            self.assertEqual(st.annotations, ref.annotations)
+
+    def test_sorted_and_annotated(self):
+        sts = model(correlation_method='spatio_temporal').produce_spiketrains()
+        self.assertEqual(len(sts), 120)
+        for st in sts:
+            self.assertTrue(np.all(np.diff(st.magnitude) >= 0))
+        self.assertEqual([st.annotations.get('Assembly') for st in sts[:16]],
+                         [0] * 4 + [1] * 6 + [2] * 6)
+        self.assertEqual(sts[16].annotations, {})
+
+    def test_subset_equals_network(self):
+        for shuffle in (False, True):
+            sts = model(shuffle=shuffle).produce_spiketrains()
+            subset_model = model(shuffle=shuffle)
+            subset = subset_model.produce_spiketrains(max_subsamplesize=30)
+            self.assertIsNone(subset_model.columns)
+            self.assert_equal_spiketrains(subset, sts[:30])
+
+    def test_window_equals_time_slice(self):
+        network = model()
+        sts = network.produce_spiketrains()
+        for n in (None, 30):
+            self.assert_equal_spiketrains(
+                network.produce_spiketrains(max_subsamplesize=n,
+                                            t_start=0.5 * pq.s),
+                [st.time_slice(0.5 * pq.s, None) for st in sts[:n]])
+
+    def test_spiketrains_attribute(self):
+        # tests which read model.spiketrains get the whole network
+        network = model()
+        sts = network.spiketrains
+        self.assertEqual(len(sts), 120)
+        self.assertIs(network.produce_spiketrains()[0], sts[0])
+        self.assert_equal_spiketrains(sts, model().produce_spiketrains())
+
+    def test_columns(self):
+        network = model()
+        columns, assembly = network.spiketrain_columns()
+        self.assertIsNone(network._spiketrains)
+        self.assertEqual(len(columns), 120)
+        self.assertEqual(list(assembly[14:18]), [2, 2, -1, -1])
+        sts = network.produce_spiketrains()
+        self.assertIs(network.produce_spiketrains()[0], sts[0])
+        np.testing.assert_array_equal(sts[5].magnitude,
+                                      columns.spiketimes(5))
+
+
+class SeedTestCase(unittest.TestCase):
+
+    def spiketimes(self, **params):
+        return [st.magnitude for st in model(**params).produce_spiketrains()]
+
+    def assert_equal_spiketimes(self, sts, reference):
+        self.assertEqual(len(sts), len(reference))
+        for times, ref in zip(sts, reference):
+            np.testing.assert_array_equal(times, ref)
+
+    def test_identical_across_n_processes(self):
+        for correlation_method in ('CPP', 'spatio_temporal'):
+            reference = self.spiketimes(correlation_method=correlation_method)
+            for n_processes, block_size in ((2, 25), (3, 25), (2, 10)):
+                sts = self.spiketimes(correlation_method=correlation_method,
+                                      n_processes=n_processes,
+                                      block_size=block_size)
+                if block_size == PARAMS['block_size']:
+                    self.assert_equal_spiketimes(sts, reference)
+                else:
+                    # other blocks have other random streams
+                    self.assertFalse(np.array_equal(sts[-1], reference[-1]))
+
+    def test_seeds(self):
+        reference = self.spiketimes(seed=1)
+        self.assert_equal_spiketimes(self.spiketimes(seed=1), reference)
+        self.assertFalse(np.array_equal(self.spiketimes(seed=2)[0],
+                                        reference[0]))
+
+    def test_unseeded_instances_differ(self):
+        model(seed=3)
+        first = stochastic_activity(size=20, t_stop=1000 * pq.ms)
+        second = stochastic_activity(size=20, t_stop=1000 * pq.ms)
+        self.assertNotEqual(first._seed, second._seed)
+        self.assertFalse(np.array_equal(
+            first.produce_spiketrains()[0].magnitude,
+            second.produce_spiketrains()[0].magnitude))
+
+    def test_params_do_not_leak(self):
+        defaults = dict(stochastic_activity.params)
+        model(size=50, seed=3, shuffle=True, shuffle_seed=4,
+              assembly_sizes=[5], correlations=[0.1])
+        self.assertEqual(stochastic_activity.params, defaults)
+        self.assertEqual(stochastic_activity().params['seed'], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
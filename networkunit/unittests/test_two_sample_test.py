@@ -0,0 +1,64 @@
+import gc
+import unittest
+from copy import copy
+import numpy as np
+import sciunit
+from networkunit.scores import ks_distance
+from networkunit.tests.base_tests import two_sample_test
+
+
+class sample_model(sciunit.Model):
+
+    def __init__(self, name=None, **params):
+        self.calls = 0
+        super(sample_model, self).__init__(name=name, **params)
+
+    def produce_sample(self, size=10, **kwargs):
+        self.calls += 1
+        return np.arange(size, dtype=float)
+
+
+class sample_test(two_sample_test):
+    score_type = ks_distance
+    params = {'size': 10}
+
+    def validate_observation(self, observation):
+        pass
+
+
+class PredictionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test = sample_test(observation=np.arange(10.))
+        self.test.params = dict(sample_test.params)
+        self.model = sample_model()
+
+    def test_prediction_is_reused(self):
+        prediction = self.test.generate_prediction(self.model)
+        self.assertIs(self.test.generate_prediction(self.model), prediction)
+        self.assertEqual(self.model.calls, 1)
+
+    def test_params_change_invalidates(self):
+        self.test.generate_prediction(self.model)
+        self.test.params['size'] = 5
+        self.assertEqual(len(self.test.generate_prediction(self.model)), 5)
+        self.assertEqual(self.model.calls, 2)
+
+    def test_model_is_not_kept_alive(self):
+        self.test.generate_prediction(self.model)
+        self.assertEqual(len(self.test._predictions), 1)
+        del self.model
+        gc.collect()
+        self.assertEqual(len(self.test._predictions), 0)
+
+    def test_copies_do_not_share_predictions(self):
+        self.test.generate_prediction(self.model)
+        test_copy = copy(self.test)
+        test_copy.generate_prediction(self.model)
+        self.assertEqual(self.model.calls, 2)
+        test_copy.clear_predictions()
+        self.assertEqual(len(self.test._predictions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+"""Loads NetworkUnit helper functions shared by tests, capabilities and models"""
+
+import covariance
+import cross_correlation
+import binning
+import observation_cache
+import segmentation
+import spiketrain_columns
+import neuron_types
+import judge_suite as _judge_suite
+
+from covariance import *
+from cross_correlation import *
+from binning import *
+from observation_cache import *
+from segmentation import *
+from spiketrain_columns import *
+from neuron_types import *
+from judge_suite import *
+
+# only the functions and classes are exported by a star import, not the
+# submodules, whose names (e.g. covariance) clash with elephant functions
+__all__ = (covariance.__all__ + cross_correlation.__all__ + binning.__all__
+           + observation_cache.__all__ + segmentation.__all__
+           + spiketrain_columns.__all__ + neuron_types.__all__
+           + _judge_suite.__all__)
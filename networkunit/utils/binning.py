@@ -0,0 +1,109 @@
+from elephant.conversion import BinnedSpikeTrain
+from collections import OrderedDict
+import weakref
+import quantities as pq
+import neo
+
+__all__ = ['BinnedSpikeTrainCache', 'binning_cache', 'cached_BinnedSpikeTrain']
+
+
+class BinnedSpikeTrainCache(object):
+    """
+    Least recently used cache of elephant.conversion.BinnedSpikeTrain objects
+    so that a set of spike trains is binned only once per resolution, even
+    when it is analyzed by several tests.
+
+    The cache is keyed on the identity of the spike train objects and on the
+    binning parameters (binsize, num_bins, t_start, t_stop). It holds only
+    weak references to the spike trains: an entry is dropped as soon as one
+    of its spike trains is garbage collected, so the cache never keeps spike
+    trains alive and a reused identity never hits a stale entry. The cached
+    BinnedSpikeTrain objects do not reference their input spike trains
+    either (lst_input is None), so the cache owns exactly the sparse binned
+    matrices. When these exceed max_bytes, the least recently used entries
+    are evicted. While enabled is False, spike trains are binned without
+    storing the result, e.g. for spike trains which are analyzed only once.
+    """
+
+    def __init__(self, max_bytes=2**26):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.enabled = True
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, spiketrains, binsize=None, num_bins=None, t_start=None,
+            t_stop=None):
+        """
+        Returns the binned spike trains from the cache or bins them and
+        stores the result. Parameters as elephant.conversion.BinnedSpikeTrain.
+        """
+        if isinstance(spiketrains, neo.SpikeTrain):
+            spiketrains = [spiketrains]
+        spiketrains = list(spiketrains)
+        key = (tuple(id(st) for st in spiketrains),
+               self._time_key(binsize), num_bins,
+               self._time_key(t_start), self._time_key(t_stop))
+        if key in self._entries:
+            entry = self._entries.pop(key)
+            if all(ref() is st for ref, st in zip(entry[0], spiketrains)):
+                self._entries[key] = entry
+                return entry[1]
+            self.nbytes -= entry[2]
+        binned_sts = BinnedSpikeTrain(spiketrains, binsize=binsize,
+                                      num_bins=num_bins, t_start=t_start,
+                                      t_stop=t_stop)
+        binned_sts.lst_input = None
+        if not self.enabled:
+            return binned_sts
+        size = self._size(binned_sts)
+        if size <= self.max_bytes:
+            evict = self._evict_callback(key)
+            refs = [weakref.ref(st, evict) for st in spiketrains]
+            self._entries[key] = (refs, binned_sts, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+        return binned_sts
+
+    def _evict_callback(self, key):
+        # called when one of the spike trains of the entry is collected; the
+        # cache itself is only weakly referenced by the callback
+        cache = weakref.ref(self)
+
+        def evict(_):
+            self_ = cache()
+            if self_ is not None and key in self_._entries:
+                self_.nbytes -= self_._entries.pop(key)[2]
+        return evict
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    @staticmethod
+    def _time_key(t):
+        if t is None:
+            return None
+        return float(t.rescale(pq.s))
+
+    @staticmethod
+    def _size(binned_sts):
+        spmat = binned_sts.to_sparse_array()
+        return spmat.data.nbytes + spmat.indices.nbytes + spmat.indptr.nbytes
+
+
+binning_cache = BinnedSpikeTrainCache()
+
+
+def cached_BinnedSpikeTrain(spiketrains, binsize=None, num_bins=None,
+                            t_start=None, t_stop=None):
+    """
+    Drop-in replacement for elephant.conversion.BinnedSpikeTrain which takes
+    the binned spike trains from the shared networkunit.utils.binning_cache.
+    """
+    return binning_cache.get(spiketrains, binsize=binsize, num_bins=num_bins,
+                             t_start=t_start, t_stop=t_stop)
@@ -0,0 +1,186 @@
+import numpy as np
+
+__all__ = ['sparse_covariance', 'tiled_covariance', 'CovarianceAccumulator']
+
+
+def sparse_covariance(binned_sts, binary=False):
+    """
+    Calculates the covariance matrix of binned spike trains directly from
+    their sparse (CSR) representation without creating the dense N x T
+    binned array.
+
+    ..math::
+        $$ C = (X X^T - n n^T / T) / (T - 1) $$
+
+    where X is the sparse N x T matrix of spike counts, n the vector of spike
+    counts per spike train and T the number of bins. This is identical to
+    numpy.cov() of the dense binned array.
+
+    Parameters
+    ----------
+    binned_sts : elephant.conversion.BinnedSpikeTrain
+        Binned spike trains of N neurons.
+    binary : bool (default False)
+        If True, bins with more than one spike are counted as one spike.
+
+    Returns : numpy.ndarray
+        N x N covariance matrix.
+    -------
+    """
+    if binary:
+        spmat = binned_sts.to_sparse_bool_array().astype(float)
+    else:
+        spmat = binned_sts.to_sparse_array().astype(float)
+    num_bins = spmat.shape[1]
+    spike_counts = np.asarray(spmat.sum(axis=1)).ravel()
+    cov_matrix = spmat.dot(spmat.transpose()).toarray()
+    cov_matrix -= np.outer(spike_counts, spike_counts) / float(num_bins)
+    cov_matrix /= float(num_bins - 1)
+    return cov_matrix
+
+
+def tiled_covariance(binned_sts, binary=False, corrcoef=False,
+                     tile_size=1000, out=None):
+    """
+    Calculates the upper triangle (without diagonal) of the covariance or
+    correlation coefficient matrix of binned spike trains block by block, so
+    that peak memory is bounded by tile_size^2 instead of N^2.
+
+    Each tile of the matrix is computed from the sparse binned matrix as in
+    sparse_covariance() and its upper triangle values are streamed into the
+    output in the same order as numpy.triu_indices(N, 1).
+
+    Parameters
+    ----------
+    binned_sts : elephant.conversion.BinnedSpikeTrain
+        Binned spike trains of N neurons.
+    binary : bool (default False)
+        If True, bins with more than one spike are counted as one spike.
+    corrcoef : bool (default False)
+        If True, the covariances are normalized to correlation coefficients.
+    tile_size : int (default 1000)
+        Number of rows and columns of the square tiles.
+    out : None, numpy.ndarray or string (default None)
+        Preallocated array of length (N^2 - N)/2 to write the values into. If
+        a file name is given, the values are written into a memory-mapped
+        .npy file. If None, a new array is allocated.
+
+    Returns : numpy.ndarray or numpy.memmap
+        Array of length (N^2 - N)/2 with the pairwise covariances.
+    -------
+    """
+    if binary:
+        spmat = binned_sts.to_sparse_bool_array().astype(float)
+    else:
+        spmat = binned_sts.to_sparse_array().astype(float)
+    spmat = spmat.tocsr()
+    N, num_bins = spmat.shape
+    spike_counts = np.asarray(spmat.sum(axis=1)).ravel()
+    if corrcoef:
+        variances = np.asarray(spmat.multiply(spmat).sum(axis=1)).ravel()
+        variances = (variances - spike_counts**2 / float(num_bins)) \
+                    / float(num_bins - 1)
+        std = np.sqrt(variances)
+
+    length = N * (N - 1) / 2
+    if out is None:
+        out = np.zeros(length)
+    elif isinstance(out, basestring):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=np.float64,
+                                        shape=(length,))
+    elif len(out) != length:
+        raise ValueError('Output array must have length (N^2 - N)/2 = {}'
+                         .format(length))
+
+    # start index of row i in the flattened upper triangle
+    row_offsets = np.arange(N) * N - np.arange(N) * (np.arange(N) + 1) / 2
+
+    for r0 in range(0, N, tile_size):
+        r1 = min(r0 + tile_size, N)
+        rows = spmat[r0:r1]
+        for c0 in range(r0, N, tile_size):
+            c1 = min(c0 + tile_size, N)
+            tile = rows.dot(spmat[c0:c1].transpose()).toarray()
+            tile -= np.outer(spike_counts[r0:r1], spike_counts[c0:c1]) \
+                    / float(num_bins)
+            tile /= float(num_bins - 1)
+            if corrcoef:
+                tile /= np.outer(std[r0:r1], std[c0:c1])
+            for i in range(r0, min(r1, c1 - 1)):
+                j0 = max(c0, i + 1)
+                start = row_offsets[i] + j0 - i - 1
+                out[start:start + c1 - j0] = tile[i - r0, j0 - c0:]
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+class CovarianceAccumulator(object):
+    """
+    Accumulates the covariance matrix of N binned spike trains over
+    consecutive chunks of bins (e.g. the trials or rest segments of a
+    recording), keeping only the running sums s = sum_t x_t and
+    S = sum_t x_t x_t^T of the spike count vectors x_t and the number of bins
+    T, so that memory does not grow with the total number of bins. The
+    covariance
+
+    ..math::
+        $$ C = (S - s s^T / T) / (T - 1) $$
+
+    equals numpy.cov() of the concatenation of all chunks along the bins.
+    Spike counts are summed as integers, i.e. exactly.
+    """
+
+    def __init__(self):
+        self.sum = None
+        self.sum_outer = None
+        self.num_bins = 0
+
+    def update(self, binned_sts, binary=False):
+        """
+        Adds the bins of one chunk.
+
+        Parameters
+        ----------
+        binned_sts : elephant.conversion.BinnedSpikeTrain, scipy.sparse matrix
+                     or numpy.ndarray
+            Binned spike trains of the N neurons in this chunk, as N x T_chunk
+            matrix.
+        binary : bool (default False)
+            If True, bins with more than one spike are counted as one spike.
+            Only used for elephant.conversion.BinnedSpikeTrain.
+        """
+        if hasattr(binned_sts, 'to_sparse_array'):
+            if binary:
+                binned_sts = binned_sts.to_sparse_bool_array().astype(int)
+            else:
+                binned_sts = binned_sts.to_sparse_array()
+        if hasattr(binned_sts, 'tocsr'):
+            spmat = binned_sts.tocsr()
+            chunk_sum = np.asarray(spmat.sum(axis=1)).ravel()
+            chunk_outer = spmat.dot(spmat.transpose()).toarray()
+        else:
+            binned_sts = np.asarray(binned_sts)
+            chunk_sum = binned_sts.sum(axis=1)
+            chunk_outer = np.dot(binned_sts, binned_sts.T)
+        if self.sum is None:
+            self.sum = chunk_sum
+            self.sum_outer = chunk_outer
+        else:
+            self.sum = self.sum + chunk_sum
+            self.sum_outer = self.sum_outer + chunk_outer
+        self.num_bins += binned_sts.shape[1]
+        return self
+
+    def covariance(self):
+        """
+        Returns the N x N covariance matrix of all bins added so far.
+        Raises a ValueError if fewer than two bins have been added.
+        """
+        if self.num_bins < 2:
+            raise ValueError("The covariance requires at least two bins, "
+                             "{} have been added!".format(self.num_bins))
+        cov_matrix = self.sum_outer.astype(float)
+        cov_matrix -= np.outer(self.sum, self.sum) / float(self.num_bins)
+        cov_matrix /= float(self.num_bins - 1)
+        return cov_matrix
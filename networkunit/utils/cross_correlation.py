@@ -0,0 +1,159 @@
+from elephant.spike_train_correlation import cch
+import multiprocessing
+import numpy as np
+
+__all__ = ['pairwise_cch', 'fft_pairwise_cch']
+
+# binned spike trains of the current worker process (set by the initializer
+# of the pool, so they are only transferred once per worker)
+_worker_binned_sts = None
+
+
+def _init_cch_worker(binned_sts):
+    global _worker_binned_sts
+    _worker_binned_sts = binned_sts
+
+
+def _cch_worker(args):
+    pairs, maxlag, kwargs = args
+    return _pairwise_cch(_worker_binned_sts, pairs, maxlag, **kwargs)
+
+
+def _pairwise_cch(binned_sts, pairs, maxlag, **kwargs):
+    cch_array = np.zeros((len(pairs), 2 * maxlag + 1))
+    for count, (i, j) in enumerate(pairs):
+        cch_array[count] = np.squeeze(cch(binned_sts[i], binned_sts[j],
+                                          window=[-maxlag, maxlag],
+                                          cross_corr_coef=True,
+                                          **kwargs)[0])
+    return cch_array
+
+
+def pairwise_cch(binned_sts, pairs, maxlag, n_processes=1, **kwargs):
+    """
+    Calculates the cross-correlation coefficient histograms for the given
+    pairs of binned spike trains, optionally distributed over a local pool
+    of worker processes.
+
+    Parameters
+    ----------
+    binned_sts : list of elephant.conversion.BinnedSpikeTrain
+        One binned spike train per neuron, all with the same binsize, t_start
+        and t_stop.
+    pairs : list of (int, int)
+        Indices (i, j) of the pairs of spike trains.
+    maxlag : int
+        Maximal lag of the CCH in bins.
+    n_processes : int (default 1)
+        Number of worker processes. If 1, the CCHs are calculated in the
+        calling process. If None, all available cores are used.
+    kwargs:
+        Passed to elephant.spike_train_correlation.cch()
+
+    Returns : numpy.ndarray
+        Array of shape (len(pairs), 2*maxlag+1) with one CCH per pair in the
+        order of pairs. The result does not depend on n_processes.
+    -------
+    """
+    if n_processes is None:
+        n_processes = multiprocessing.cpu_count()
+    if n_processes == 1 or len(pairs) < 2:
+        return _pairwise_cch(binned_sts, pairs, maxlag, **kwargs)
+
+    n_chunks = min(len(pairs), 4 * n_processes)
+    chunks = [(chunk, maxlag, kwargs)
+              for chunk in np.array_split(np.asarray(pairs), n_chunks)]
+    pool = multiprocessing.Pool(processes=n_processes,
+                                initializer=_init_cch_worker,
+                                initargs=(binned_sts,))
+    try:
+        cch_chunks = pool.map(_cch_worker, chunks)
+    finally:
+        pool.close()
+        pool.join()
+    return np.vstack(cch_chunks)
+
+
+def fft_pairwise_cch(binned_sts, pairs, maxlag, binary=False,
+                     border_correction=False, kernel=None, batch_size=1000):
+    """
+    Calculates the cross-correlation coefficient histograms for many pairs of
+    spike trains at once. Each binned spike train is Fourier transformed only
+    once, the CCHs of the pairs are then obtained as the inverse transforms
+    of the vectorised products of the spectra.
+
+    The result equals the values of
+    elephant.spike_train_correlation.cch(..., window=[-maxlag, maxlag],
+    cross_corr_coef=True) up to the floating point error of the FFT, i.e.
+    the absolute difference is below 1e-10.
+
+    Parameters
+    ----------
+    binned_sts : elephant.conversion.BinnedSpikeTrain
+        Binned spike trains of all N neurons.
+    pairs : list of (int, int)
+        Indices (i, j) of the pairs of spike trains.
+    maxlag : int
+        Maximal lag of the CCH in bins.
+    binary : bool (default False)
+        If True, bins with more than one spike are counted as one spike.
+    border_correction : bool (default False)
+        Whether to correct for the border effect, see
+        elephant.spike_train_correlation.cch().
+    kernel : array or None (default None)
+        Smoothing kernel applied to each CCH, see
+        elephant.spike_train_correlation.cch().
+    batch_size : int (default 1000)
+        Number of spike trains transformed and number of pairs correlated at
+        once, which bounds the memory of the intermediate arrays.
+
+    Returns : numpy.ndarray
+        Array of shape (len(pairs), 2*maxlag+1) with one CCH per pair in the
+        order of pairs.
+    -------
+    """
+    spmat = binned_sts.to_sparse_array().tocsr()
+    N, num_bins = spmat.shape
+    if maxlag >= num_bins:
+        raise ValueError("The window exceed the length of the spike trains")
+    # zero padding to num_bins + maxlag avoids circular wrap-around
+    nfft = int(2 ** np.ceil(np.log2(num_bins + maxlag)))
+
+    spectra = np.empty((N, nfft // 2 + 1), dtype=complex)
+    for r0 in range(0, N, batch_size):
+        rows = spmat[r0:r0 + batch_size].toarray().astype(float)
+        if binary:
+            rows = (rows > 0).astype(float)
+        spectra[r0:r0 + batch_size] = np.fft.rfft(rows, n=nfft, axis=1)
+
+    # the normalization always uses the unclipped spike counts (as elephant)
+    spike_counts = np.asarray(spmat.sum(axis=1), dtype=float).ravel()
+    sq_counts = np.asarray(spmat.multiply(spmat).sum(axis=1),
+                           dtype=float).ravel()
+    variances = sq_counts - spike_counts**2 / num_bins
+
+    lags = np.arange(-maxlag, maxlag + 1)
+    if kernel is not None:
+        if len(kernel) > len(lags):
+            raise ValueError('The length of the kernel cannot be larger than '
+                             'the length %d of the resulting CCH.'
+                             % len(lags))
+        kernel = np.array(kernel, dtype=float)
+        kernel = kernel / np.sum(kernel)
+
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    cch_array = np.empty((len(pairs), len(lags)))
+    for p0 in range(0, len(pairs), batch_size):
+        i, j = pairs[p0:p0 + batch_size].T
+        counts = np.fft.irfft(np.conj(spectra[i]) * spectra[j], n=nfft,
+                              axis=1)[:, lags]
+        if border_correction:
+            counts *= float(num_bins + 1) / (num_bins + 1 - np.abs(lags))
+        if kernel is not None:
+            counts = np.array([np.convolve(c, kernel, mode='same')
+                               for c in counts])
+        expected = spike_counts[i] * spike_counts[j] / num_bins
+        norm = np.sqrt(variances[i] * variances[j])
+        cch_array[p0:p0 + batch_size] = (counts - expected[:, np.newaxis]) \
+                                        / norm[:, np.newaxis]
+    return cch_array
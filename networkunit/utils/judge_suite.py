@@ -0,0 +1,242 @@
+import multiprocessing
+import time
+from copy import copy
+import numpy as np
+import sciunit
+from networkunit.utils.binning import binning_cache
+
+__all__ = ['judge_suite', 'judge_subsamples', 'null_distribution']
+
+# tests and models of the current worker process (set by the initializer of
+# the pool, so they are only transferred once per worker)
+_worker_tests = None
+_worker_models = None
+# test, model class and model parameters of null_distribution()
+_worker_null = None
+
+
+def _init_judge_worker(tests, models):
+    global _worker_tests, _worker_models
+    _worker_tests = tests
+    _worker_models = models
+
+
+def _judge_worker(args):
+    test_index, model_index, kwargs = args
+    score, wall_time = _judge_cell(_worker_tests[test_index],
+                                   _worker_models[model_index], **kwargs)
+    # the test and the model (with its data) are not sent back, they are
+    # bound again in the parent process
+    score.test = None
+    score.model = None
+    return score, wall_time
+
+
+def _init_null_worker(test, model_class, model_params):
+    global _worker_null
+    _worker_null = (test, model_class, model_params)
+    # each realisation is analyzed only once, its binned spike trains are
+    # not kept
+    binning_cache.enabled = test is None
+
+
+def _null_prediction(seed):
+    test, model_class, model_params = _worker_null
+    model = model_class(seed=seed, **model_params)
+    prediction = test.generate_prediction(model)
+    # the realisation is not kept by the test
+    test.clear_predictions()
+    return prediction
+
+
+def _judge_cell(test, model, **kwargs):
+    start = time.time()
+    score = test.judge(model, **kwargs)
+    return score, time.time() - start
+
+
+def judge_suite(tests, models, n_processes=1, **kwargs):
+    """
+    Judges every model by every test and collects the scores in a
+    sciunit.ScoreMatrix.
+
+    The cells are processed model by model, so that the spike trains of a
+    model are produced once and their binned representations are shared by
+    all tests with the same preprocessing and binning parameters (see
+    networkunit.utils.binning_cache). With n_processes > 1 the cells are
+    distributed over a local pool of worker processes, each of which
+    receives the tests and models only once and judges whole rows of the
+    matrix.
+
+    Parameters
+    ----------
+    tests : list of two_sample_test
+        Test instances, the columns of the score matrix.
+    models : list of data_model
+        Model instances, the rows of the score matrix.
+    n_processes : int (default 1)
+        Number of worker processes. If 1, the cells are judged in the calling
+        process. If None, all available cores are used.
+    kwargs:
+        Passed to sciunit.Test.judge(), e.g. stop_on_error.
+
+    Returns : (sciunit.ScoreMatrix, numpy.ndarray)
+        The score matrix with models as index and tests as columns, and the
+        wall time in seconds of each cell in an array of shape
+        (len(models), len(tests)).
+    -------
+    """
+    if n_processes is None:
+        n_processes = multiprocessing.cpu_count()
+    cells = [(i, j, kwargs) for j in range(len(models))
+             for i in range(len(tests))]
+
+    if n_processes == 1 or len(cells) < 2:
+        results = [_judge_cell(tests[i], models[j], **kwargs)
+                   for i, j, _ in cells]
+    else:
+        pool = multiprocessing.Pool(processes=n_processes,
+                                    initializer=_init_judge_worker,
+                                    initargs=(tests, models))
+        try:
+            # a chunk of len(tests) cells is one row of the matrix
+            results = pool.map(_judge_worker, cells,
+                               chunksize=max(1, len(tests)))
+        finally:
+            pool.close()
+            pool.join()
+
+    scores = [[None] * len(tests) for _ in models]
+    wall_times = np.zeros((len(models), len(tests)))
+    for (i, j, _), (score, wall_time) in zip(cells, results):
+        score.test = tests[i]
+        score.model = models[j]
+        scores[j][i] = score
+        wall_times[j, i] = wall_time
+    return sciunit.ScoreMatrix(tests, models, scores=scores), wall_times
+
+
+def judge_subsamples(test, model, n_subsamples, seed=None, n_processes=1,
+                     **kwargs):
+    """
+    Judges the model by the test on n_subsamples random subsets of its spike
+    trains, to estimate the variability of the score due to the
+    subsampling. Each subset has the size max_subsamplesize of the test
+    parameters and is drawn by the model's preprocess() with
+    subsample='random' and its own seed, derived from seed. The data of the
+    model is loaded once, the subsets only reference the loaded spike
+    trains. Neither the test nor the parameters of the model are changed.
+
+    Parameters
+    ----------
+    test : two_sample_test
+        Test instance with max_subsamplesize in its params.
+    model : data_model
+        Model with a preprocess() supporting the subsample and seed
+        parameters, e.g. cortical_microcircuit_data.
+    n_subsamples : int
+        Number of subsets.
+    seed : int (default None)
+        Seed from which the seeds of the subsets are drawn.
+    n_processes : int (default 1)
+        Number of worker processes, see judge_suite().
+    kwargs:
+        Passed to sciunit.Test.judge().
+
+    Returns : (sciunit.ScoreMatrix, numpy.ndarray)
+        The score matrix with one column per subset, and the wall times of
+        the cells (see judge_suite()).
+    -------
+    """
+    seeds = np.random.RandomState(seed).randint(np.iinfo(np.int32).max,
+                                                size=n_subsamples)
+    tests = []
+    for count, subsample_seed in enumerate(seeds):
+        subsample_test = copy(test)
+        # the copy must neither share the predictions nor the params dict
+        subsample_test.clear_predictions()
+        subsample_test.params = dict(test.params, subsample='random',
+                                     seed=int(subsample_seed))
+        subsample_test.name = '{} (subsample {})'.format(test.name, count)
+        tests.append(subsample_test)
+    return judge_suite(tests, [model], n_processes=n_processes, **kwargs)
+
+
+def null_distribution(test, model_class, n_samples, seed=None, n_processes=1,
+                      **model_params):
+    """
+    Samples the distribution of the test score between independent
+    realisations of a stochastic model with identical parameters, e.g.
+    stochastic_activity, to calibrate the scores of the test.
+
+    2 * n_samples realisations are generated, each with its own seed derived
+    from seed, and the test prediction (e.g. the covariances) is computed
+    for each of them, in a local pool of n_processes worker processes. The
+    realisations are discarded right after their prediction, and the
+    predictions are paired (realisation 2k with 2k+1) and scored as they
+    arrive, so that the memory does not grow with n_samples. The binned
+    spike trains of the realisations are not stored in
+    networkunit.utils.binning_cache, and the models of the realisations run
+    with n_processes=1 within the worker processes.
+
+    Parameters
+    ----------
+    test : two_sample_test
+        Test instance whose parameters and score_type are used.
+    model_class : class
+        Model class accepting a seed parameter, e.g. stochastic_activity.
+    n_samples : int
+        Number of scores.
+    seed : int (default None)
+        Seed from which the seeds of the realisations are drawn.
+    n_processes : int (default 1)
+        Number of worker processes, see judge_suite().
+    model_params:
+        Parameters of the model realisations.
+
+    Returns : numpy.ndarray
+        The n_samples scores (score.score of test.score_type).
+    -------
+    """
+    seeds = np.random.RandomState(seed).randint(np.iinfo(np.int32).max,
+                                                size=2 * n_samples)
+    seeds = [int(realisation_seed) for realisation_seed in seeds]
+    if n_processes is None:
+        n_processes = multiprocessing.cpu_count()
+    # the realisations are generated with a copy of the test, so that the
+    # predictions and params of the test of the caller are left untouched
+    null_test = copy(test)
+    null_test.params = dict(test.params)
+    null_test.clear_predictions()
+
+    if n_processes == 1:
+        cache_enabled = binning_cache.enabled
+        _init_null_worker(null_test, model_class, model_params)
+        pool = None
+        predictions = (_null_prediction(realisation_seed)
+                       for realisation_seed in seeds)
+    else:
+        # the workers of the pool are daemonic processes, which cannot start
+        # their own pool in the model
+        model_params = dict(model_params, n_processes=1)
+        pool = multiprocessing.Pool(processes=n_processes,
+                                    initializer=_init_null_worker,
+                                    initargs=(null_test, model_class,
+                                              model_params))
+        predictions = pool.imap(_null_prediction, seeds)
+
+    scores = np.zeros(n_samples)
+    try:
+        for count in xrange(n_samples):
+            prediction_a = next(predictions)
+            prediction_b = next(predictions)
+            scores[count] = test.score_type.compute(prediction_a, prediction_b,
+                                                    **test.params).score
+    finally:
+        if pool is None:
+            _init_null_worker(None, None, None)
+            binning_cache.enabled = cache_enabled
+        else:
+            pool.close()
+            pool.join()
+    return scores
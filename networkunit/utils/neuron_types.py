@@ -0,0 +1,88 @@
+import numpy as np
+
+__all__ = ['NEURON_TYPES', 'NeuronTypeIndex']
+
+# integer codes of the neuron types, -1 stands for a unit without type
+NEURON_TYPES = ('exc', 'inh', 'mix')
+
+
+class NeuronTypeIndex(object):
+    """
+    Neuron types of N units as integer codes (index into NEURON_TYPES, -1 if
+    unknown) together with the indices of the units of each type, which are
+    computed once so that selecting the units of a type does not loop over
+    the spike train annotations.
+    """
+
+    def __init__(self, codes):
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self._ids = dict((neu_type, np.flatnonzero(self.codes == code))
+                         for code, neu_type in enumerate(NEURON_TYPES))
+
+    @classmethod
+    def from_consistency(cls, class_file, eiThres=0.4):
+        """
+        Classifies the units by the consistency of their waveforms, i.e. the
+        percentage of single waveforms with trough-to-peak times larger than
+        350ms, stored per unit in class_file. Units with a consistency of at
+        least 1-eiThres are putative excitatory, of at most eiThres putative
+        inhibitory, all others are mixed.
+        """
+        consistency = np.loadtxt(class_file, dtype=np.float16)
+        codes = -np.ones(len(consistency), dtype=np.int8)
+        codes[consistency >= 1 - eiThres] = NEURON_TYPES.index('exc')
+        codes[consistency <= eiThres] = NEURON_TYPES.index('inh')
+        codes[np.logical_and(consistency > eiThres,
+                             consistency < 1 - eiThres)] \
+            = NEURON_TYPES.index('mix')
+        return cls(codes)
+
+    @classmethod
+    def from_labels(cls, labels):
+        """
+        Creates the index from a sequence of neuron type names.
+        """
+        labels = np.asarray(labels)
+        codes = -np.ones(len(labels), dtype=np.int8)
+        for code, neu_type in enumerate(NEURON_TYPES):
+            codes[labels == neu_type] = code
+        return cls(codes)
+
+    @classmethod
+    def from_annotations(cls, spiketrains):
+        """
+        Creates the index from the 'neu_type' annotations of spike trains.
+        """
+        return cls.from_labels([st.annotations.get('neu_type', '')
+                                for st in spiketrains])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ids(self, neu_type):
+        """
+        Returns the indices of the units of neu_type.
+        """
+        return self._ids[neu_type]
+
+    def types(self):
+        """
+        Returns the neuron types which occur among the units.
+        """
+        return [neu_type for neu_type in NEURON_TYPES
+                if len(self._ids[neu_type])]
+
+    def labels(self):
+        """
+        Returns the neuron type name of each unit ('' if unknown).
+        """
+        names = np.array(NEURON_TYPES + ('',))
+        return names[self.codes]
+
+    def annotate(self, spiketrains):
+        """
+        Annotates the spike trains with their 'neu_type'.
+        """
+        for neu_type in NEURON_TYPES:
+            for i in self._ids[neu_type]:
+                spiketrains[i].annotations['neu_type'] = neu_type
@@ -0,0 +1,111 @@
+import numpy as np
+import hashlib
+import json
+import os
+
+__all__ = ['ObservationCache']
+
+
+class ObservationCache(object):
+    """
+    Content-addressed on-disk cache of computed observations.
+
+    An observation (a dictionary of arrays, e.g. the covariances per neuron
+    type) is stored as a compressed .npz file. Its key is the hash of the
+    checksums of all input files and of the analysis parameters, so that a
+    change of any input invalidates the stored observation.
+
+    The checksums of the input files are themselves cached per file path,
+    size and modification time, so an unchanged data set is not read again.
+
+    By default the cache is located in the user cache directory
+    ($XDG_CACHE_HOME or ~/.cache) under networkunit/observations, so that it
+    does not depend on the current working directory.
+    """
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                os.environ.get('XDG_CACHE_HOME',
+                               os.path.join(os.path.expanduser('~'),
+                                            '.cache')),
+                'networkunit', 'observations')
+        self.cache_dir = cache_dir
+        self._checksum_file = os.path.join(cache_dir, 'checksums.json')
+
+    def key(self, files, **params):
+        """
+        Returns the hash of the content of the input files and the
+        parameters.
+
+        Parameters
+        ----------
+        files : list of strings
+            Paths of the input files.
+        params :
+            Analysis parameters, which are represented by their str().
+        """
+        checksums = self._load_checksums()
+        n_checksums = len(checksums)
+        digest = hashlib.sha1()
+        for file_path in sorted(files):
+            digest.update(self.file_checksum(file_path, checksums))
+        for name in sorted(params.keys()):
+            digest.update('{}={};'.format(name, params[name]))
+        # the checksums are only written if new ones were computed
+        if len(checksums) != n_checksums:
+            self._save_checksums(checksums)
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        Returns the observation stored under key as dictionary of arrays, or
+        None if there is none.
+        """
+        file_path = self._path(key)
+        if not os.path.isfile(file_path):
+            return None
+        with np.load(file_path) as data:
+            return dict((name, data[name]) for name in data.files)
+
+    def save(self, key, observation):
+        """
+        Stores a dictionary of arrays under key.
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        np.savez_compressed(self._path(key), **observation)
+
+    def file_checksum(self, file_path, checksums=None, blocksize=2**20):
+        """
+        Returns the sha1 checksum of the file content.
+        """
+        stat = os.stat(file_path)
+        file_key = '{}:{}:{}'.format(os.path.abspath(file_path),
+                                     stat.st_size, stat.st_mtime)
+        if checksums is not None and file_key in checksums:
+            return checksums[file_key]
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            block = f.read(blocksize)
+            while block:
+                digest.update(block)
+                block = f.read(blocksize)
+        if checksums is not None:
+            checksums[file_key] = digest.hexdigest()
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def _load_checksums(self):
+        if not os.path.isfile(self._checksum_file):
+            return {}
+        with open(self._checksum_file) as f:
+            return json.load(f)
+
+    def _save_checksums(self, checksums):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        with open(self._checksum_file, 'w') as f:
+            json.dump(checksums, f)
@@ -0,0 +1,71 @@
+import numpy as np
+import quantities as pq
+
+__all__ = ['segment_offsets', 'slice_spiketrains']
+
+
+def segment_offsets(spiketimes, t_starts, t_stops):
+    """
+    Finds the spikes of each unit within each of the segments
+    [t_starts[k], t_stops[k]] (both borders included, as
+    neo.SpikeTrain.time_slice()). For each unit, all segment borders are
+    found by a single np.searchsorted on its sorted spike times.
+
+    Parameters
+    ----------
+    spiketimes : list of numpy.ndarray
+        Sorted spike times of each of the N units.
+    t_starts, t_stops : numpy.ndarray
+        Start and stop times of the M segments, in the same units as the
+        spike times.
+
+    Returns : (numpy.ndarray, numpy.ndarray)
+        Integer arrays starts, stops of shape (N, M), such that
+        spiketimes[i][starts[i, k]:stops[i, k]] are the spikes of unit i in
+        segment k.
+    -------
+    """
+    t_starts = np.asarray(t_starts, dtype=float)
+    t_stops = np.asarray(t_stops, dtype=float)
+    # searching the next larger float of t_stop includes spikes at t_stop
+    borders = np.concatenate((t_starts, np.nextafter(t_stops, np.inf)))
+    M = len(t_starts)
+    offsets = np.empty((len(spiketimes), 2 * M), dtype=int)
+    for i, times in enumerate(spiketimes):
+        offsets[i] = np.searchsorted(times, borders, side='left')
+    return offsets[:, :M], offsets[:, M:]
+
+
+def slice_spiketrains(spiketrains, t_starts, t_stops):
+    """
+    Cuts each spike train into the segments [t_starts[k], t_stops[k]].
+    The result is equal to calling time_slice() on each spike train for
+    each segment, but the spike trains of the segments are views into the
+    original spike trains instead of copies.
+
+    Parameters
+    ----------
+    spiketrains : list of neo.SpikeTrain
+        N spike trains with sorted spike times.
+    t_starts, t_stops : Quantity arrays
+        Start and stop times of the M segments.
+
+    Returns : numpy.ndarray
+        Object array of shape (M, N) of neo.SpikeTrain.
+    -------
+    """
+    M, N = len(t_starts), len(spiketrains)
+    sliced = np.empty((M, N), dtype=object)
+    for i, st in enumerate(spiketrains):
+        seg_starts = t_starts.rescale(st.units).magnitude
+        seg_stops = t_stops.rescale(st.units).magnitude
+        starts, stops = segment_offsets([st.magnitude], seg_starts, seg_stops)
+        # borders of the segments are clipped to those of the spike train
+        seg_starts = np.maximum(seg_starts, st.t_start.magnitude) * st.units
+        seg_stops = np.minimum(seg_stops, st.t_stop.magnitude) * st.units
+        for k in xrange(M):
+            segment = st[starts[0, k]:stops[0, k]]
+            segment.t_start = seg_starts[k]
+            segment.t_stop = seg_stops[k]
+            sliced[k, i] = segment
+    return sliced
@@ -0,0 +1,236 @@
+import numpy as np
+import scipy.sparse as sps
+import quantities as pq
+import neo
+
+__all__ = ['SpikeTrainColumns']
+
+
+class SpikeTrainColumns(object):
+    """
+    Compact columnar container of N spike trains.
+
+    The spike times of all units are stored in one float64 array, the
+    annotations used by the tests in one typed array per annotation. Slicing,
+    selecting units and binning are vectorised operations on these arrays,
+    neo.SpikeTrain objects are only created on request.
+
+    Attributes
+    ----------
+    times : numpy.ndarray
+        Spike times of all units in units, concatenated unit by unit.
+    offsets : numpy.ndarray
+        Integer array of length N+1. The spike times of unit i are
+        times[offsets[i]:offsets[i+1]].
+    units : quantities unit
+        Time unit of times, t_start and t_stop.
+    t_start, t_stop : numpy.ndarray
+        Start and stop times of each unit.
+    neu_type : numpy.ndarray
+        Neuron type ('exc', 'inh', 'mix') of each unit, '' if not known.
+    el_id, ca_id : numpy.ndarray
+        Electrode id and connector aligned id of each unit, -1 if not known.
+    sua : numpy.ndarray
+        Boolean array, True for single units.
+    """
+
+    def __init__(self, times, offsets, t_start, t_stop, units=pq.s,
+                 neu_type=None, el_id=None, ca_id=None, sua=None):
+        self.times = np.asarray(times, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=int)
+        self.units = units
+        N = len(self.offsets) - 1
+        self.t_start = np.zeros(N) + t_start
+        self.t_stop = np.zeros(N) + t_stop
+        self.neu_type = np.asarray(['']*N if neu_type is None else neu_type,
+                                   dtype='S3')
+        self.el_id = np.asarray([-1]*N if el_id is None else el_id,
+                                dtype=int)
+        self.ca_id = np.asarray([-1]*N if ca_id is None else ca_id,
+                                dtype=int)
+        self.sua = np.asarray([False]*N if sua is None else sua, dtype=bool)
+
+    @classmethod
+    def from_spiketimes(cls, spiketimes, t_start, t_stop, units=pq.s,
+                        **annotations):
+        """
+        Creates the container from a list of spike time arrays (without
+        units) and scalar or per unit t_start and t_stop.
+        """
+        offsets = np.concatenate(
+            ([0], np.cumsum([len(times) for times in spiketimes])))
+        times = np.concatenate([np.asarray(times, dtype=float)
+                                for times in spiketimes] + [np.zeros(0)])
+        return cls(times, offsets, t_start, t_stop, units=units,
+                   **annotations)
+
+    @classmethod
+    def from_spiketrains(cls, spiketrains, units=None):
+        """
+        Creates the container from a list of neo.SpikeTrain. The times are
+        converted to units (default: the units of the first spike train),
+        the annotations 'neu_type', 'el_id', 'ca_id' and 'sua' are taken
+        over if present.
+        """
+        if units is None:
+            units = spiketrains[0].units if len(spiketrains) else pq.s
+        spiketimes = [st.rescale(units).magnitude for st in spiketrains]
+        t_start = [st.t_start.rescale(units).magnitude for st in spiketrains]
+        t_stop = [st.t_stop.rescale(units).magnitude for st in spiketrains]
+        annotations = [st.annotations for st in spiketrains]
+        return cls.from_spiketimes(
+            spiketimes, np.array(t_start, dtype=float),
+            np.array(t_stop, dtype=float), units=units,
+            neu_type=[an.get('neu_type', '') for an in annotations],
+            el_id=[an.get('el_id', -1) for an in annotations],
+            ca_id=[an.get('ca_id', -1) for an in annotations],
+            sua=[an.get('sua', False) for an in annotations])
+
+    @classmethod
+    def concatenate(cls, columns):
+        """
+        Joins a list of containers with the same units into one container of
+        all their units.
+        """
+        units = columns[0].units if len(columns) else pq.s
+        offsets = np.concatenate([[0]] + [
+            c.offsets[1:] + shift for c, shift in zip(
+                columns, np.cumsum([0] + [len(c.times) for c in columns]))])
+        return cls(np.concatenate([c.times for c in columns] + [np.zeros(0)]),
+                   offsets,
+                   np.concatenate([c.t_start for c in columns] + [np.zeros(0)]),
+                   np.concatenate([c.t_stop for c in columns] + [np.zeros(0)]),
+                   units=units,
+                   neu_type=np.concatenate([c.neu_type for c in columns]
+                                           + [np.zeros(0, dtype='S3')]),
+                   el_id=np.concatenate([c.el_id for c in columns]
+                                        + [np.zeros(0, dtype=int)]),
+                   ca_id=np.concatenate([c.ca_id for c in columns]
+                                        + [np.zeros(0, dtype=int)]),
+                   sua=np.concatenate([c.sua for c in columns]
+                                      + [np.zeros(0, dtype=bool)]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """
+        Returns the neo.SpikeTrain of unit index, whose times are a view into
+        times, or, for a slice, an index or boolean array, the container of
+        the selected units.
+        """
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            st = neo.SpikeTrain(self.spiketimes(index), units=self.units,
+                                t_start=self.t_start[index],
+                                t_stop=self.t_stop[index], copy=False)
+            st.annotate(neu_type=self.neu_type[index],
+                        el_id=int(self.el_id[index]),
+                        ca_id=int(self.ca_id[index]),
+                        sua=bool(self.sua[index]))
+            return st
+        return self.select(index)
+
+    def spiketimes(self, i):
+        """
+        Returns the spike times of unit i as view into times (without
+        units).
+        """
+        return self.times[self.offsets[i]:self.offsets[i + 1]]
+
+    def spike_counts(self):
+        return np.diff(self.offsets)
+
+    def unit_index(self):
+        """
+        Returns the index of the unit of each spike in times.
+        """
+        return np.repeat(np.arange(len(self)), self.spike_counts())
+
+    def sort(self):
+        """
+        Sorts the spike times of each unit, by a single np.lexsort on
+        (unit, time) of all spikes. Returns the container.
+        """
+        self.times = self.times[np.lexsort((self.times, self.unit_index()))]
+        return self
+
+    def to_spiketrains(self):
+        """
+        Returns the list of neo.SpikeTrain of all units.
+        """
+        return [self[i] for i in xrange(len(self))]
+
+    def select(self, index):
+        """
+        Returns the container of the units selected by a slice, an index or
+        a boolean array.
+        """
+        index = np.arange(len(self))[index]
+        counts = self.spike_counts()[index]
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        # position of each selected spike in times
+        spike_index = np.arange(offsets[-1]) \
+                      + np.repeat(self.offsets[index] - offsets[:-1], counts)
+        return SpikeTrainColumns(self.times[spike_index], offsets,
+                                 self.t_start[index], self.t_stop[index],
+                                 units=self.units,
+                                 neu_type=self.neu_type[index],
+                                 el_id=self.el_id[index],
+                                 ca_id=self.ca_id[index],
+                                 sua=self.sua[index])
+
+    def by_type(self, neu_type):
+        """
+        Returns the container of the units with the given neu_type.
+        """
+        return self.select(self.neu_type == neu_type)
+
+    def time_slice(self, t_start, t_stop):
+        """
+        Returns the container of the spikes within [t_start, t_stop] (both
+        included, as neo.SpikeTrain.time_slice()).
+        """
+        t_start = t_start.rescale(self.units).magnitude
+        t_stop = t_stop.rescale(self.units).magnitude
+        mask = (self.times >= t_start) & (self.times <= t_stop)
+        counts = np.bincount(self.unit_index()[mask], minlength=len(self))
+        return SpikeTrainColumns(self.times[mask],
+                                 np.concatenate(([0], np.cumsum(counts))),
+                                 np.maximum(self.t_start, t_start),
+                                 np.minimum(self.t_stop, t_stop),
+                                 units=self.units, neu_type=self.neu_type,
+                                 el_id=self.el_id, ca_id=self.ca_id,
+                                 sua=self.sua)
+
+    def binned(self, binsize, t_start=None, t_stop=None):
+        """
+        Returns the spike counts of all units in bins of binsize between
+        t_start and t_stop (default: the latest t_start and earliest t_stop
+        of the units) as scipy.sparse.csr_matrix of shape (N, num_bins).
+        The matrix equals elephant.conversion.BinnedSpikeTrain(...,
+        binsize=binsize, t_start=t_start, t_stop=t_stop).to_sparse_array().
+        """
+        if t_start is None:
+            t_start = self.t_start.max() * self.units
+        if t_stop is None:
+            t_stop = self.t_stop.min() * self.units
+        num_bins = int(((t_stop - t_start).rescale(binsize.units)
+                        / binsize).magnitude)
+        # the same operations as elephant, but on the spikes of all units
+        times = pq.Quantity(self.times, self.units, copy=False)
+        scale = np.array(((times - t_start).rescale(binsize.units)
+                          / binsize).magnitude, dtype=int)
+        mask = (times >= t_start.rescale(binsize.units)) \
+               & (times <= t_stop.rescale(binsize.units))
+        mask[mask] = scale[mask] < num_bins
+        binned = sps.csr_matrix((np.ones(np.count_nonzero(mask), dtype=int),
+                                 (self.unit_index()[mask], scale[mask])),
+                                shape=(len(self), num_bins), dtype=int)
+        binned.sum_duplicates()
+        return binned